@@ -1,28 +1,36 @@
-import os
+import gzip
 import json
-import time
-import requests
 import logging
-import re
-from flask import Flask, request, jsonify
+import os
+import time
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify
+from flask.json import JSONEncoder
 from flask_cors import CORS
 from dotenv import load_dotenv
-from flasgger import Swagger
-import base64
-from bs4 import BeautifulSoup
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from werkzeug.local import LocalProxy
 
 from config import Config
+from services.cache import cache_status
+from services.cache_warmer import create_cache_warmer
+from services.circuit_breaker import breakers
 from services.ebay_service import EbayService
+from services.listing_service import ListingService
+from services.price_stats import PriceStats
 from utils.error_handlers import (
     EbayApiError, ValidationError,
     handle_ebay_api_error, handle_validation_error,
     handle_not_found, handle_server_error
 )
+from utils import metrics
+from utils.compression import finalize_response
+from utils.logging_config import configure_logging, log_access
+from utils.projection import project, project_search
+from utils.request_args import get_fields_projection, get_limit, get_listing_url, get_marketplace
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, filename='app.log', format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -36,82 +44,184 @@ def create_error_response(error_message, details=None, status_code=500):
         response['details'] = details
     return jsonify(response), status_code
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": Config.CORS_ORIGINS}})
+def raw_response(payload):
+    """Send an upstream body unchanged, decompressing it only for clients that do not accept gzip"""
+    response = Response(payload.body, content_type=payload.content_type)
+    if payload.content_encoding == 'gzip':
+        if request.accept_encodings['gzip']:
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response.set_data(gzip.decompress(payload.body))
+    response.vary.add('Accept-Encoding')
+    return response
+
+def get_api_key():
+    """Return the caller's API key when it is one of the configured keys"""
+    api_key = request.headers.get(Config.API_KEY_HEADER)
+    return api_key if api_key in Config.API_KEY_LIMITS else None
+
+def has_api_key():
+    return get_api_key() is not None
 
-# Initialize rate limiter
+def rate_limit_key():
+    """Rate-limit clients by API key when they send a known one, by remote address otherwise"""
+    api_key = get_api_key()
+    return f'key:{api_key}' if api_key else get_remote_address()
+
+def api_key_limit():
+    """Limit across all routes for the calling API key; anonymous callers are exempt from it"""
+    return Config.API_KEY_LIMITS.get(get_api_key(), Config.RATE_LIMIT)
+
+class TimedJSONEncoder(JSONEncoder):
+    """JSON encoder that records time spent serializing responses"""
+
+    def encode(self, o):
+        with metrics.STAGE_LATENCY.time(stage='serialize'):
+            return super().encode(o)
+
+# Rate limiter, bound to the app in create_app(); counters live in RATELIMIT_STORAGE_URI so workers can share them
 limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=[Config.RATE_LIMIT]
+    key_func=rate_limit_key,
+    default_limits=[Config.RATE_LIMIT],
+    application_limits=[api_key_limit],
+    application_limits_exempt_when=lambda: not has_api_key(),
+    storage_uri=Config.RATELIMIT_STORAGE_URI,
+    in_memory_fallback_enabled=True
 )
 
-# Load OpenAPI specification
-try:
-    with open('openapi.json', 'r') as f:
-        swagger_config = json.load(f)
-    swagger = Swagger(app, template=swagger_config)
-    logger.info("Swagger initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Swagger: {str(e)}")
-    raise
-
-# Initialize eBay service
-ebay_service = EbayService()
-
-# eBay API configuration
-EBAY_APP_ID = os.environ.get('EBAY_APP_ID')
-EBAY_CLIENT_SECRET = os.environ.get('EBAY_CLIENT_SECRET')
-EBAY_OAUTH_URL = 'https://api.ebay.com/identity/v1/oauth2/token'
-EBAY_SEARCH_URL = 'https://api.ebay.com/buy/browse/v1/item_summary/search'
-EBAY_ITEM_URL = 'https://api.ebay.com/buy/browse/v1/item/'
-EBAY_CATEGORY_URL = 'https://api.ebay.com/commerce/taxonomy/v1/category_tree/0/get_category_suggestions'
-
-# Token cache
-access_token = None
-token_expiry = 0
-
-def get_ebay_token():
-    """
-    Get OAuth token from eBay API
-    Returns a valid access token
-    """
-    global access_token, token_expiry
-    now = time.time()
-    
-    if access_token and token_expiry > now:
-        return access_token
-    
+# Routes and request hooks, registered on the app by create_app()
+api = Blueprint('api', __name__)
+
+# The services belong to the app built by create_app(); these resolve to the current app's instances
+ebay_service = LocalProxy(lambda: current_app.extensions['ebay_service'])
+listing_service = LocalProxy(lambda: current_app.extensions['listing_service'])
+
+def init_swagger(app):
+    """Serve Swagger UI at /apidocs; flasgger and openapi.json are only loaded when docs are enabled"""
+    from flasgger import Swagger
+
     try:
-        auth_string = f"{EBAY_APP_ID}:{EBAY_CLIENT_SECRET}"
-        encoded_auth = base64.b64encode(auth_string.encode()).decode()
-        
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Authorization': f'Basic {encoded_auth}'
-        }
-        
-        data = {
-            'grant_type': 'client_credentials',
-            'scope': 'https://api.ebay.com/oauth/api_scope'
-        }
-        
-        response = requests.post(EBAY_OAUTH_URL, headers=headers, data=data)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        access_token = response_data['access_token']
-        token_expiry = now + response_data['expires_in'] - (5 * 60)
-        
-        logger.info("Successfully retrieved eBay OAuth token")
-        return access_token
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'openapi.json'), 'r') as f:
+            swagger_config = json.load(f)
+        Swagger(app, template=swagger_config)
+        logger.info("Swagger initialized successfully")
     except Exception as e:
-        logger.error(f'Error getting eBay token: {str(e)}')
-        raise Exception('Failed to authenticate with eBay API')
+        logger.error(f"Failed to initialize Swagger: {str(e)}")
+        raise
+
+def create_app():
+    """
+    Build the Flask app and its services.
+    Safe to call in a gunicorn master with preload_app: nothing here opens
+    upstream connections or starts threads; the token refresher, category
+    index loader and cache warmer start in each worker on first use.
+    Phase timings are logged and exported as ebay_proxy_startup_seconds.
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    app = Flask(__name__)
+    app.json_encoder = TimedJSONEncoder
+    CORS(app, resources={r"/*": {"origins": Config.CORS_ORIGINS}})
+    limiter.init_app(app)
+
+    if Config.DOCS_ENABLED:
+        phase_started = time.perf_counter()
+        init_swagger(app)
+        timings['swagger'] = time.perf_counter() - phase_started
+
+    phase_started = time.perf_counter()
+    ebay = EbayService()
+    listings = ListingService()
+    app.extensions['ebay_service'] = ebay
+    app.extensions['listing_service'] = listings
+    app.extensions['cache_warmer'] = create_cache_warmer(ebay)
+    timings['services'] = time.perf_counter() - phase_started
+
+    # Kept per app rather than on the shared registry, so another create_app() call does not repeat them
+    app.extensions['metrics_collectors'] = [
+        metrics.cache_collector({
+            'ebay': ebay.cache,
+            'listing': listings.cache
+        }),
+        metrics.breaker_collector(breakers)
+    ]
+
+    app.register_blueprint(api)
+    app.register_error_handler(404, handle_not_found)
+    app.register_error_handler(500, handle_server_error)
+
+    timings['total'] = time.perf_counter() - started
+    app.extensions['metrics_collectors'].append(metrics.startup_collector(timings))
+    logger.info('App created in ' + ', '.join(f'{phase} {seconds * 1000:.0f} ms' for phase, seconds in timings.items()))
+    return app
+
+@api.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    cache_status.set(None)
+    metrics.request_upstream.set({'calls': 0, 'seconds': 0.0})
+
+@api.after_app_request
+def add_cache_status(response):
+    status = cache_status.get()
+    if status is not None:
+        response.headers['X-Cache'] = status.upper()
+        if status == 'stale':
+            response.headers['Warning'] = '110 - "Response is Stale"'
+    return response
+
+@api.after_app_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, route=route)
+    metrics.REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    if response.status_code == 429:
+        metrics.RATE_LIMITED.inc(route=route)
+    return response
+
+@api.after_app_request
+def log_request(response):
+    start = g.get('request_start')
+    log_access(
+        request.method,
+        request.url_rule.rule if request.url_rule else 'unmatched',
+        request.query_string.decode('utf-8', 'replace'),
+        response.status_code,
+        time.perf_counter() - start if start is not None else 0.0,
+        cache_status.get(),
+        metrics.request_upstream.get()
+    )
+    # Requests rejected before start_request_timer must not report this request's upstream calls
+    metrics.request_upstream.set(None)
+    return response
 
-@app.route('/search', methods=['GET'])
-@limiter.limit("30 per minute")
+# Routes whose JSON bodies get ETags and compression
+COMPRESSED_ROUTES = {'/search', '/search/stats', '/item', '/category'}
+
+@api.after_app_request
+def compress_response(response):
+    if request.url_rule is not None and request.url_rule.rule in COMPRESSED_ROUTES:
+        return finalize_response(request, response)
+    return response
+
+@api.route('/metrics', methods=['GET'])
+@limiter.exempt
+def prometheus_metrics():
+    """
+    Prometheus metrics for this worker
+    ---
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format
+    """
+    return Response(metrics.registry.render(current_app.extensions['metrics_collectors']),
+                    mimetype='text/plain; version=0.0.4')
+
+@api.route('/search', methods=['GET'])
+@limiter.limit("30 per minute", exempt_when=has_api_key)
 def search_products():
     """
     Search eBay products
@@ -126,8 +236,19 @@ def search_products():
         in: query
         type: integer
         required: false
-        description: Maximum number of results to return
+        description: Maximum number of results to return (1-200)
         default: 5
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated dotted field paths to return (e.g. itemId,title,price.value), or "compact"
+      - name: marketplace
+        in: query
+        type: string
+        required: false
+        description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+        default: EBAY_US
     responses:
       200:
         description: eBay search results
@@ -138,13 +259,26 @@ def search_products():
     """
     try:
         q = request.args.get('q')
-        limit = request.args.get('limit', default=Config.DEFAULT_SEARCH_LIMIT, type=int)
         
         if not q:
             raise ValidationError('Search query is required')
         
-        results = ebay_service.search_products(q, limit)
-        logger.info(f"Search query '{q}' returned {len(results.get('items', []))} results")
+        limit = get_limit(request.args, Config.DEFAULT_SEARCH_LIMIT, Config.SEARCH_STREAM_PAGE_SIZE)
+        fields = get_fields_projection(request.args)
+        marketplace = get_marketplace(request.args)
+        cache_warmer = current_app.extensions['cache_warmer']
+        if cache_warmer is not None:
+            cache_warmer.record_search(q, limit, marketplace)
+
+        if Config.PASSTHROUGH_ENABLED and fields is None:
+            payload = ebay_service.search_products_raw(q, limit, marketplace=marketplace)
+            logger.debug("Search query '%s' passed through (%d bytes)", q, len(payload.body))
+            return raw_response(payload)
+
+        results = ebay_service.search_products(q, limit, marketplace=marketplace)
+        logger.debug("Search query '%s' returned %d results", q, len(results.get('itemSummaries', [])))
+        if fields is not None:
+            results = project_search(results, fields)
         return jsonify(results)
     except ValidationError as e:
         return handle_validation_error(e)
@@ -154,8 +288,174 @@ def search_products():
         logger.error(f'Error searching products: {str(e)}')
         return handle_server_error(e)
 
-@app.route('/item', methods=['GET'])
-@limiter.limit("30 per minute")
+@api.route('/search/stream', methods=['GET'])
+@limiter.limit("10 per minute", exempt_when=has_api_key)
+def stream_search_products():
+    """
+    Stream eBay search results across pages
+    ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Search query
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of results to stream (1-10000)
+        default: 500
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [ndjson, json]
+        description: One item summary per line (ndjson) or a single chunked JSON document (json)
+        default: ndjson
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated dotted field paths to return (e.g. itemId,title,price.value), or "compact"
+      - name: marketplace
+        in: query
+        type: string
+        required: false
+        description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+        default: EBAY_US
+    responses:
+      200:
+        description: Item summaries streamed as they are fetched
+      400:
+        description: Bad request
+      500:
+        description: Server error
+    """
+    try:
+        q = request.args.get('q')
+        limit = get_limit(request.args, Config.SEARCH_STREAM_DEFAULT_LIMIT, Config.SEARCH_MAX_OFFSET)
+        output_format = request.args.get('format', 'ndjson')
+        fields = get_fields_projection(request.args)
+        marketplace = get_marketplace(request.args)
+
+        if not q:
+            raise ValidationError('Search query is required')
+        if output_format not in ('ndjson', 'json'):
+            raise ValidationError("Format must be 'ndjson' or 'json'")
+
+        pages = ebay_service.iter_search_pages(q, limit, marketplace=marketplace)
+        # Fetch the first page up front so upstream errors still get a proper status code
+        first_page = next(pages)
+        logger.debug("Streaming search query '%s' up to %d results", q, limit)
+
+        if fields is not None:
+            first_page = project(first_page, fields)
+            pages = (project(page, fields) for page in pages)
+
+        if output_format == 'ndjson':
+            body = _stream_ndjson(first_page, pages)
+            mimetype = 'application/x-ndjson'
+        else:
+            body = _stream_json(first_page, pages)
+            mimetype = 'application/json'
+        return Response(body, mimetype=mimetype)
+    except ValidationError as e:
+        return handle_validation_error(e)
+    except EbayApiError as e:
+        return handle_ebay_api_error(e)
+    except Exception as e:
+        logger.error(f'Error streaming search results: {str(e)}')
+        return handle_server_error(e)
+
+def _iter_streamed_items(first_page, pages):
+    yield from first_page
+    for page in pages:
+        yield from page
+
+def _stream_ndjson(first_page, pages):
+    try:
+        for item in _iter_streamed_items(first_page, pages):
+            yield json.dumps(item) + '\n'
+    except EbayApiError as e:
+        # Headers are already sent; report the failure as the last record
+        logger.error(f'Search stream interrupted: {e.message}')
+        yield json.dumps({'error': e.message, 'details': e.details}) + '\n'
+
+def _stream_json(first_page, pages):
+    yield '{"itemSummaries": ['
+    count = 0
+    error = None
+    try:
+        for item in _iter_streamed_items(first_page, pages):
+            yield (', ' if count else '') + json.dumps(item)
+            count += 1
+    except EbayApiError as e:
+        logger.error(f'Search stream interrupted: {e.message}')
+        error = {'error': e.message, 'details': e.details}
+    yield f'], "total": {count}'
+    if error:
+        yield ', "error": ' + json.dumps(error)
+    yield '}'
+
+@api.route('/search/stats', methods=['GET'])
+@limiter.limit("10 per minute", exempt_when=has_api_key)
+def search_price_stats():
+    """
+    Price statistics over eBay search results
+    ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Search query
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Number of search results to aggregate, 1-2000 (pages of 200 are fetched concurrently)
+        default: 1000
+      - name: marketplace
+        in: query
+        type: string
+        required: false
+        description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+        default: EBAY_US
+    responses:
+      200:
+        description: Price, shipping and total price statistics with counts by condition and seller
+      400:
+        description: Bad request
+      500:
+        description: Server error
+    """
+    try:
+        q = request.args.get('q')
+        limit = get_limit(request.args, Config.SEARCH_STATS_DEFAULT_LIMIT, Config.SEARCH_STATS_MAX_LIMIT)
+        marketplace = get_marketplace(request.args)
+
+        if not q:
+            raise ValidationError('Search query is required')
+
+        stats = PriceStats()
+        for page in ebay_service.iter_search_pages_concurrently(q, limit, marketplace=marketplace):
+            stats.add(page)
+        # Pages after the first are fetched in their own contexts, so the cache status would describe only one page
+        cache_status.set(None)
+        result = stats.result()
+        logger.debug("Price stats for '%s' over %d results", q, result['items'])
+        return jsonify(dict(query=q, marketplace=marketplace, **result))
+    except ValidationError as e:
+        return handle_validation_error(e)
+    except EbayApiError as e:
+        return handle_ebay_api_error(e)
+    except Exception as e:
+        logger.error(f'Error computing price stats: {str(e)}')
+        return handle_server_error(e)
+
+@api.route('/item', methods=['GET'])
+@limiter.limit("30 per minute", exempt_when=has_api_key)
 def get_item_details():
     """
     Get item details by item ID
@@ -166,6 +466,17 @@ def get_item_details():
         type: string
         required: true
         description: eBay item ID
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated dotted field paths to return (e.g. itemId,title,price.value), or "compact"
+      - name: marketplace
+        in: query
+        type: string
+        required: false
+        description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+        default: EBAY_US
     responses:
       200:
         description: eBay item detail
@@ -180,8 +491,21 @@ def get_item_details():
         if not item_id:
             raise ValidationError('Item ID is required')
         
-        details = ebay_service.get_item_details(item_id)
-        logger.info(f"Retrieved details for item ID {item_id}")
+        fields = get_fields_projection(request.args)
+        marketplace = get_marketplace(request.args)
+        cache_warmer = current_app.extensions['cache_warmer']
+        if cache_warmer is not None:
+            cache_warmer.record_item(item_id, marketplace)
+
+        if Config.PASSTHROUGH_ENABLED and fields is None:
+            payload = ebay_service.get_item_details_raw(item_id, marketplace=marketplace)
+            logger.debug("Retrieved details for item ID %s (%d bytes passed through)", item_id, len(payload.body))
+            return raw_response(payload)
+
+        details = ebay_service.get_item_details(item_id, marketplace=marketplace)
+        logger.debug("Retrieved details for item ID %s", item_id)
+        if fields is not None:
+            details = project(details, fields)
         return jsonify(details)
     except ValidationError as e:
         return handle_validation_error(e)
@@ -191,8 +515,64 @@ def get_item_details():
         logger.error(f'Error getting item details: {str(e)}')
         return handle_server_error(e)
 
-@app.route('/category', methods=['GET'])
-@limiter.limit("30 per minute")
+@api.route('/items', methods=['POST'])
+@limiter.limit("10 per minute", exempt_when=has_api_key)
+def get_items_batch():
+    """
+    Get details for several items in one request
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: string
+              description: eBay item IDs
+            marketplace:
+              type: string
+              description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+              default: EBAY_US
+          required:
+            - ids
+    responses:
+      200:
+        description: Item details and per-item errors keyed by item ID
+      400:
+        description: Bad request
+      500:
+        description: Server error
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            # Invalid JSON, or JSON that is not an object (e.g. a bare list of IDs)
+            data = {}
+        ids = data.get('ids')
+
+        if isinstance(ids, list):
+            ids = [str(item_id).strip() for item_id in ids if str(item_id).strip()]
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError('A non-empty list of item IDs is required')
+        if len(set(ids)) > Config.BATCH_MAX_ITEMS:
+            raise ValidationError(f'At most {Config.BATCH_MAX_ITEMS} item IDs are allowed per request')
+        marketplace = get_marketplace(request.args, data)
+
+        items, errors = ebay_service.get_items(ids, marketplace=marketplace)
+        logger.debug("Batch lookup for %d item IDs: %d found, %d failed", len(ids), len(items), len(errors))
+        return jsonify({'items': items, 'errors': errors})
+    except ValidationError as e:
+        return handle_validation_error(e)
+    except Exception as e:
+        logger.error(f'Error getting item details in batch: {str(e)}')
+        return handle_server_error(e)
+
+@api.route('/category', methods=['GET'])
+@limiter.limit("30 per minute", exempt_when=has_api_key)
 def suggest_category():
     """
     Suggest category based on keyword
@@ -203,6 +583,12 @@ def suggest_category():
         type: string
         required: true
         description: Category keyword
+      - name: marketplace
+        in: query
+        type: string
+        required: false
+        description: eBay marketplace ID (e.g. EBAY_US, EBAY_GB, EBAY_DE, EBAY_AU)
+        default: EBAY_US
     responses:
       200:
         description: eBay category suggestion
@@ -216,9 +602,10 @@ def suggest_category():
         
         if not q:
             raise ValidationError('Query is required')
+        marketplace = get_marketplace(request.args)
         
-        suggestions = ebay_service.suggest_category(q)
-        logger.info(f"Category suggestions generated for query '{q}'")
+        suggestions = ebay_service.suggest_category(q, marketplace=marketplace)
+        logger.debug("Category suggestions generated for query '%s'", q)
         return jsonify(suggestions)
     except ValidationError as e:
         return handle_validation_error(e)
@@ -228,8 +615,8 @@ def suggest_category():
         logger.error(f'Error suggesting category: {str(e)}')
         return handle_server_error(e)
 
-@app.route('/analyze-listing', methods=['POST'])
-@limiter.limit("20 per minute")
+@api.route('/analyze-listing', methods=['POST'])
+@limiter.limit("20 per minute", exempt_when=has_api_key)
 def analyze_listing():
     """
     Analyze an eBay listing URL and extract title, keywords, and snippet.
@@ -253,49 +640,39 @@ def analyze_listing():
         description: Invalid input or listing URL
       500:
         description: Server error
+      502:
+        description: Listing page download failed
+      504:
+        description: Listing page download exceeded LISTING_DOWNLOAD_TIMEOUT
     """
     try:
-        data = request.get_json()
-        url = data.get("url")
-        
-        if not url:
-            raise ValidationError("Missing URL")
-        if not re.match(r'^https?://(www\.)?ebay\.com/itm/', url):
-            raise ValidationError("Invalid eBay listing URL")
-
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-        if response.status_code != 200:
-            raise ValidationError("Listing URL not available or removed")
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        title = soup.find("h1")
-        desc_div = soup.find("div", id="desc_div") or soup.find("div", id="viTabs_0_is")
-        
-        raw_title = title.get_text(strip=True) if title else "No title found"
-        raw_description = desc_div.get_text(strip=True) if desc_div else "No description available"
-
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', (raw_title + " " + raw_description).lower())
-        keywords = sorted(set(words))
-
-        result = {
-            "title": raw_title,
-            "keywords": keywords[:20],
-            "description_snippet": raw_description[:250]
-        }
-        logger.info(f"Analyzed listing URL: {url}")
+        url = get_listing_url(request.get_json(silent=True))
+
+        result = listing_service.analyze(url)
+        logger.debug("Analyzed listing URL: %s", url)
         return jsonify(result)
     except ValidationError as e:
         return handle_validation_error(e)
+    except EbayApiError as e:
+        return handle_ebay_api_error(e)
     except Exception as e:
         logger.error(f"Error analyzing listing URL: {str(e)}")
         return handle_server_error(e)
 
-# Register error handlers
-app.register_error_handler(404, handle_not_found)
-app.register_error_handler(500, handle_server_error)
+_app = None
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=Config.PORT, debug=Config.DEBUG)
+def __getattr__(name):
+    """
+    Build the module-level `app` on first access, so `gunicorn app:app` keeps
+    working while importing this module creates nothing.
+    `your_application` is an alias kept for Gunicorn compatibility.
+    """
+    global _app
+    if name not in ('app', 'your_application'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = create_app()
+    return _app
 
-# Alias for Gunicorn compatibility
-your_application = app
+if __name__ == '__main__':
+    create_app().run(host='0.0.0.0', port=Config.PORT, debug=Config.DEBUG)
@@ -0,0 +1,281 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import time
+
+from dotenv import load_dotenv
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from config import Config
+from services.async_ebay_service import AsyncEbayService
+from services.cache import cache_status, create_response_cache
+from services.cache_warmer import create_cache_warmer
+from services.circuit_breaker import breakers
+from services.ebay_service import EbayService
+from services.http_client import get_upstream_client
+from services.listing_service import ListingService
+from services.token_manager import TokenManager
+from services.upstream_budget import create_upstream_budget
+from utils import metrics
+from utils.error_handlers import (
+    EbayApiError, ValidationError,
+    ebay_api_error_body, validation_error_body, not_found_body, server_error_body
+)
+from utils.logging_config import configure_logging, log_access
+from utils.projection import project, project_search
+from utils.request_args import get_fields_projection, get_limit, get_listing_url, get_marketplace
+
+# Async serving mode: gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+# Serves /search, /item, /category, /analyze-listing and /metrics with the same
+# parameters and JSON responses as app.py; upstream I/O is awaited so one worker
+# process can keep many eBay calls in flight. /items, /search/stream,
+# /search/stats, ETag/304 handling and PASSTHROUGH_ENABLED exist only in app.py.
+
+# Configure logging
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# OAuth stays on the pooled sync client; the token is renewed in the background
+tokens = TokenManager(get_upstream_client())
+cache = create_response_cache()
+budget = create_upstream_budget()
+# The category tree is downloaded off the event loop, by the sync service in a background thread
+tree_service = EbayService(cache=cache, budget=budget, tokens=tokens)
+ebay_service = AsyncEbayService(tokens, cache=cache, budget=budget, category_index=tree_service.category_index)
+listing_service = ListingService()
+# The warmer refills the shared cache through the sync service, off the event loop
+cache_warmer = create_cache_warmer(tree_service, raw=False)
+
+metrics.registry.register_collector(metrics.cache_collector({
+    'ebay': ebay_service.cache,
+    'listing': listing_service.cache
+}))
+metrics.registry.register_collector(metrics.breaker_collector(breakers))
+
+rate_limiter = MovingWindowRateLimiter(storage_from_string(Config.RATELIMIT_STORAGE_URI))
+api_key_limits = {api_key: parse(limit) for api_key, limit in Config.API_KEY_LIMITS.items()}
+
+
+def rate_limit(limit):
+    """
+    Per-client rate limit for a route, mirroring the flask_limiter limits in app.py.
+    Clients sending a configured API key are held to their key's limit across
+    all routes instead. Counters may live in Redis, so they are hit in a thread.
+    """
+    item = parse(limit)
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(request):
+            api_key = request.headers.get(Config.API_KEY_HEADER)
+            if api_key in api_key_limits:
+                allowed = await asyncio.to_thread(rate_limiter.hit, api_key_limits[api_key], 'key', api_key)
+                exceeded = Config.API_KEY_LIMITS[api_key]
+            else:
+                allowed = await asyncio.to_thread(rate_limiter.hit, item, request.url.path,
+                                                  request.client.host if request.client else '')
+                exceeded = limit
+            if not allowed:
+                metrics.RATE_LIMITED.inc(route=request.url.path)
+                return JSONResponse({'error': f'Rate limit exceeded: {exceeded}'}, status_code=429)
+            cache_status.set(None)
+            return await endpoint(request)
+        return wrapper
+    return decorator
+
+
+def cached_json_response(data):
+    """JSON response carrying the X-Cache status of the upstream data it was built from"""
+    response = JSONResponse(data)
+    status = cache_status.get()
+    if status is not None:
+        response.headers['X-Cache'] = status.upper()
+        if status == 'stale':
+            response.headers['Warning'] = '110 - "Response is Stale"'
+    return response
+
+
+def validation_error_response(error):
+    return JSONResponse(*validation_error_body(error))
+
+
+def ebay_api_error_response(error):
+    return JSONResponse(*ebay_api_error_body(error))
+
+
+def server_error_response(error):
+    return JSONResponse(*server_error_body(error))
+
+
+@rate_limit("30 per minute")
+async def search_products(request):
+    try:
+        q = request.query_params.get('q')
+
+        if not q:
+            raise ValidationError('Search query is required')
+
+        limit = get_limit(request.query_params, Config.DEFAULT_SEARCH_LIMIT, Config.SEARCH_STREAM_PAGE_SIZE)
+        fields = get_fields_projection(request.query_params)
+        marketplace = get_marketplace(request.query_params)
+        if cache_warmer is not None:
+            cache_warmer.record_search(q, limit, marketplace)
+
+        results = await ebay_service.search_products(q, limit, marketplace=marketplace)
+        logger.debug("Search query '%s' returned %d results", q, len(results.get('itemSummaries', [])))
+        if fields is not None:
+            results = project_search(results, fields)
+        return cached_json_response(results)
+    except ValidationError as e:
+        return validation_error_response(e)
+    except EbayApiError as e:
+        return ebay_api_error_response(e)
+    except Exception as e:
+        logger.error(f'Error searching products: {str(e)}')
+        return server_error_response(e)
+
+
+@rate_limit("30 per minute")
+async def get_item_details(request):
+    try:
+        item_id = request.query_params.get('id')
+
+        if not item_id:
+            raise ValidationError('Item ID is required')
+
+        fields = get_fields_projection(request.query_params)
+        marketplace = get_marketplace(request.query_params)
+        if cache_warmer is not None:
+            cache_warmer.record_item(item_id, marketplace)
+
+        details = await ebay_service.get_item_details(item_id, marketplace=marketplace)
+        logger.debug("Retrieved details for item ID %s", item_id)
+        if fields is not None:
+            details = project(details, fields)
+        return cached_json_response(details)
+    except ValidationError as e:
+        return validation_error_response(e)
+    except EbayApiError as e:
+        return ebay_api_error_response(e)
+    except Exception as e:
+        logger.error(f'Error getting item details: {str(e)}')
+        return server_error_response(e)
+
+
+@rate_limit("30 per minute")
+async def suggest_category(request):
+    try:
+        q = request.query_params.get('q')
+
+        if not q:
+            raise ValidationError('Query is required')
+
+        suggestions = await ebay_service.suggest_category(q, marketplace=get_marketplace(request.query_params))
+        logger.debug("Category suggestions generated for query '%s'", q)
+        return cached_json_response(suggestions)
+    except ValidationError as e:
+        return validation_error_response(e)
+    except EbayApiError as e:
+        return ebay_api_error_response(e)
+    except Exception as e:
+        logger.error(f'Error suggesting category: {str(e)}')
+        return server_error_response(e)
+
+
+@rate_limit("20 per minute")
+async def analyze_listing(request):
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        url = get_listing_url(data)
+
+        result = await listing_service.analyze_async(url, ebay_service.client)
+        logger.debug("Analyzed listing URL: %s", url)
+        return JSONResponse(result)
+    except ValidationError as e:
+        return validation_error_response(e)
+    except EbayApiError as e:
+        return ebay_api_error_response(e)
+    except Exception as e:
+        logger.error(f"Error analyzing listing URL: {str(e)}")
+        return server_error_response(e)
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(metrics.registry.render(), media_type='text/plain; version=0.0.4')
+
+
+class MetricsMiddleware:
+    """Records request counts and latency per route, and writes the access log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        response_status = [500]
+        cache_status.set(None)
+        metrics.request_upstream.set({'calls': 0, 'seconds': 0.0})
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                response_status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope['path'] if scope['path'] in ROUTE_PATHS else 'unmatched'
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, route=route)
+            metrics.REQUESTS.inc(route=route, method=scope['method'], status=response_status[0])
+            log_access(scope['method'], route, scope['query_string'].decode('utf-8', 'replace'), response_status[0],
+                       time.perf_counter() - start, cache_status.get(), metrics.request_upstream.get())
+
+
+async def not_found(request, exc):
+    return JSONResponse(*not_found_body())
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await ebay_service.aclose()
+
+
+routes = [
+    Route('/search', search_products, methods=['GET']),
+    Route('/item', get_item_details, methods=['GET']),
+    Route('/category', suggest_category, methods=['GET']),
+    Route('/analyze-listing', analyze_listing, methods=['POST']),
+    Route('/metrics', prometheus_metrics, methods=['GET'])
+]
+ROUTE_PATHS = frozenset(route.path for route in routes)
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=Config.CORS_ORIGINS),
+        Middleware(GZipMiddleware, minimum_size=Config.COMPRESSION_MIN_SIZE)
+    ],
+    exception_handlers={404: not_found},
+    lifespan=lifespan
+)
@@ -0,0 +1,72 @@
+"""
+Benchmark the listing extraction engines used by /analyze-listing.
+
+    python -m benchmarks.bench_listing_parser [page.html ...] [--repeat N]
+
+Runs on the saved pages in benchmarks/fixtures/ unless paths are given,
+checks that both engines extract the same title and description, and
+reports time and peak memory per parse.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from services.listing_parser import extract_with_scanner, extract_with_soup
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+ENGINES = [
+    ('soup', extract_with_soup),
+    ('fast', extract_with_scanner)
+]
+
+
+def time_engine(engine, html, repeat):
+    """Return the best wall time in ms over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine(html)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def peak_memory(engine, html):
+    """Return the peak memory allocated by one run in KB"""
+    tracemalloc.start()
+    engine(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark listing page extraction')
+    parser.add_argument('pages', nargs='*', help='saved listing HTML files (default: benchmarks/fixtures/*.html)')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per engine and page')
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    print(f"{'page':<28} {'KB':>6} {'engine':<6} {'best ms':>9} {'peak KB':>9} {'speedup':>8}")
+
+    for path in pages:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            html = f.read()
+
+        expected = extract_with_soup(html)
+        if extract_with_scanner(html) != expected:
+            print(f'{os.path.basename(path)}: engines disagree, skipping')
+            continue
+
+        baseline = None
+        for name, engine in ENGINES:
+            ms = time_engine(engine, html, args.repeat)
+            baseline = baseline or ms
+            print(f'{os.path.basename(path):<28} {len(html) / 1024:>6.0f} {name:<6} '
+                  f'{ms:>9.2f} {peak_memory(engine, html):>9.0f} {baseline / ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Load test the proxy against the local eBay stand-in.
+
+    python -m benchmarks.load_test [--workers 1,4] [--concurrency 8,32] [--duration 10]
+                                   [--routes search,item,category,items,analyze-listing,search-stats]
+                                   [--latency 50] [--error-rate 0] [--asgi] [--no-cache]
+
+Starts benchmarks.mock_ebay, then for each worker count runs the app under
+gunicorn (sync workers with --threads, or uvicorn workers with --asgi)
+pointed at the stand-in, and drives every route with each client
+concurrency for --duration seconds. --asgi drives only search, item and
+category: asgi:app has no items or search-stats route, and its async
+client ignores http_proxy, so listing pages cannot reach the stand-in. Reports requests, RPS, error count and
+p50/p95/p99 latency per route. Queries and item IDs are drawn from
+--distinct values, so with the cache on the hit ratio depends on it.
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process
+
+import requests
+
+from benchmarks.mock_ebay import create_server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = 'load-test'
+
+# Routes driven with --asgi (see the module docstring)
+ASGI_ROUTES = ('search', 'item', 'category')
+
+WORDS = ['iphone', 'case', 'vintage', 'camera', 'lens', 'watch', 'lego', 'guitar', 'shoes', 'jacket',
+         'laptop', 'charger', 'ring', 'lamp', 'drone', 'console', 'headphones', 'bike', 'tent', 'knife']
+
+
+def build_request(route, rng, distinct):
+    """Return (method, path, json body) for one request to a route"""
+    n = rng.randrange(distinct)
+    query = f'{WORDS[n % len(WORDS)]} {n}'
+    if route == 'search':
+        return 'GET', f'/search?q={query}&limit=20', None
+    if route == 'search-stats':
+        return 'GET', f'/search/stats?q={query}&limit=1000', None
+    if route == 'item':
+        return 'GET', f'/item?id=v1|{100000000000 + n}|0', None
+    if route == 'category':
+        return 'GET', f'/category?q={query}', None
+    if route == 'items':
+        ids = [f'v1|{100000000000 + rng.randrange(distinct)}|0' for _ in range(10)]
+        return 'POST', '/items', {'ids': ids}
+    if route == 'analyze-listing':
+        return 'POST', '/analyze-listing', {'url': f'http://www.ebay.com/itm/{100000000000 + n}'}
+    raise ValueError(f'Unknown route: {route}')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def drive(base_url, route, concurrency, duration, distinct):
+    """Send requests from `concurrency` threads for `duration` seconds; return (latencies, errors)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        session.headers['X-API-Key'] = API_KEY
+        own = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            method, path, body = build_request(route, rng, distinct)
+            start = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, json=body, timeout=30)
+                response.content
+                if response.status_code >= 400:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors[0]
+
+
+def start_app(args, workers, port, mock_url, log_dir):
+    env = dict(os.environ)
+    env.update({
+        'EBAY_API_BASE_URL': mock_url,
+        'EBAY_APP_ID': 'load-test',
+        'EBAY_CLIENT_SECRET': 'load-test',
+        'http_proxy': mock_url,  # listing pages on ebay.com are served by the stand-in
+        'no_proxy': '127.0.0.1,localhost',
+        'API_KEY_LIMITS': f'{API_KEY}=1000000 per minute',
+        'EBAY_DAILY_CALL_QUOTA': '0',
+        'CACHE_ENABLED': 'false' if args.no_cache else 'true',
+        'LOG_FILE': os.path.join(log_dir, 'app.log')  # keep the app's log out of the working tree
+    })
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+               '--log-level', 'warning']
+    if args.asgi:
+        command += ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app']
+    else:
+        command += ['--threads', str(args.threads), 'app:app']
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/metrics', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('App did not start within 30 seconds')
+
+
+def run_mock(port, latency, jitter, error_rate):
+    create_server('127.0.0.1', port, latency, jitter, error_rate).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the proxy against a local eBay stand-in')
+    parser.add_argument('--workers', default='1,4', help='comma-separated gunicorn worker counts')
+    parser.add_argument('--threads', type=int, default=8, help='threads per sync worker')
+    parser.add_argument('--concurrency', default='8,32', help='comma-separated client concurrency levels')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per route and setting')
+    parser.add_argument('--routes', default='search,item,category,items,analyze-listing')
+    parser.add_argument('--distinct', type=int, default=1000, help='distinct queries / item IDs per route')
+    parser.add_argument('--latency', type=float, default=50, help='stand-in latency per request, ms')
+    parser.add_argument('--jitter', type=float, default=10, help='stand-in latency jitter, ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of stand-in responses that are 503s')
+    parser.add_argument('--asgi', action='store_true', help='serve asgi:app with uvicorn workers')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--app-port', type=int, default=8090)
+    parser.add_argument('--mock-port', type=int, default=8081)
+    args = parser.parse_args()
+
+    mock_url = f'http://127.0.0.1:{args.mock_port}'
+    mock = Process(target=run_mock, args=(args.mock_port, args.latency, args.jitter, args.error_rate), daemon=True)
+    mock.start()
+
+    routes = args.routes.split(',')
+    if args.asgi:
+        skipped = [route for route in routes if route not in ASGI_ROUTES]
+        if skipped:
+            print(f"Skipping routes not supported with --asgi: {', '.join(skipped)}", file=sys.stderr)
+        routes = [route for route in routes if route in ASGI_ROUTES]
+    log_dir = tempfile.mkdtemp(prefix='ebay-proxy-load-test-')
+    print(f"{'workers':>7} {'conc':>5} {'route':<16} {'requests':>9} {'rps':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    try:
+        for workers in (int(value) for value in args.workers.split(',')):
+            app = start_app(args, workers, args.app_port, mock_url, log_dir)
+            try:
+                base_url = f'http://127.0.0.1:{args.app_port}'
+                for concurrency, route in itertools.product(
+                        (int(value) for value in args.concurrency.split(',')), routes):
+                    latencies, errors = drive(base_url, route, concurrency, args.duration, args.distinct)
+                    print(f'{workers:>7} {concurrency:>5} {route:<16} {len(latencies):>9} '
+                          f'{len(latencies) / args.duration:>8.1f} {errors:>7} '
+                          f'{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} '
+                          f'{percentile(latencies, 0.99) * 1000:>8.1f}', flush=True)
+            finally:
+                app.terminate()
+                app.wait()
+    finally:
+        mock.terminate()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Local stand-in for the eBay APIs and listing pages, for load tests.
+
+    python -m benchmarks.mock_ebay [--port 8081] [--latency 50] [--jitter 10] [--error-rate 0.01]
+
+Serves OAuth tokens, Browse search/item/get_items, Taxonomy category
+suggestions and category tree, and listing pages (/itm/<id>, from the
+saved pages in benchmarks/fixtures/). Responses are synthetic but shaped
+like eBay's. Every request waits --latency ms (plus up to --jitter ms)
+and fails with a 503 with probability --error-rate.
+
+Point the app at it with EBAY_API_BASE_URL=http://127.0.0.1:<port>.
+Listing URLs must stay on ebay.com, so /analyze-listing reaches the stand-in
+by using it as HTTP proxy: set http_proxy=http://127.0.0.1:<port> and post
+http://www.ebay.com/itm/<id> URLs.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+CONDITIONS = ['New', 'Used', 'Open box', 'Certified - Refurbished', 'For parts or not working']
+SELLERS = [f'seller_{n}' for n in range(50)]
+TOTAL_RESULTS = 10000
+
+_CATEGORY_TREE_RE = re.compile(r'^/commerce/taxonomy/v1/category_tree/(\w+)$')
+_SUGGESTIONS_RE = re.compile(r'^/commerce/taxonomy/v1/category_tree/(\w+)/get_category_suggestions$')
+_ITEM_RE = re.compile(r'^/buy/browse/v1/item/(.+)$')
+_LISTING_RE = re.compile(r'^/itm/(?:[^/]+/)?(\d+)')
+
+
+def item_summary(n, q=''):
+    """Deterministic item summary number n, shaped like a Browse search result"""
+    rng = random.Random(n)
+    return {
+        'itemId': f'v1|{100000000000 + n}|0',
+        'title': f'{q or "Item"} {n} {rng.choice(["black", "blue", "silver", "red"])}'.strip(),
+        'price': {'value': f'{rng.uniform(5, 500):.2f}', 'currency': 'USD'},
+        'condition': rng.choice(CONDITIONS),
+        'seller': {'username': rng.choice(SELLERS), 'feedbackPercentage': '99.5', 'feedbackScore': rng.randint(1, 50000)},
+        'shippingOptions': [{'shippingCostType': 'FIXED',
+                             'shippingCost': {'value': f'{rng.choice([0, 0, 4.99, 9.99, 14.5]):.2f}', 'currency': 'USD'}}],
+        'image': {'imageUrl': f'https://i.ebayimg.com/images/g/{n}/s-l225.jpg'},
+        'itemWebUrl': f'https://www.ebay.com/itm/{100000000000 + n}',
+        'buyingOptions': ['FIXED_PRICE']
+    }
+
+
+def item_detail(item_id):
+    n = int(re.sub(r'\D', '', item_id) or 0) % 1000000
+    item = item_summary(n)
+    item.update({
+        'itemId': item_id,
+        'description': 'Synthetic item description. ' * 40,
+        'categoryPath': 'Electronics|Cell Phones & Accessories|Cell Phones & Smartphones',
+        'itemLocation': {'country': 'US'},
+        'estimatedAvailabilities': [{'estimatedAvailabilityStatus': 'IN_STOCK', 'estimatedAvailableQuantity': 10}]
+    })
+    return item
+
+
+def category_tree(tree_id):
+    """A small three-level tree in the shape of get_category_tree"""
+    def node(category_id, name, level, children=()):
+        return {
+            'category': {'categoryId': str(category_id), 'categoryName': name},
+            'categoryTreeNodeLevel': level,
+            'childCategoryTreeNodes': list(children),
+            'leafCategoryTreeNode': not children
+        }
+
+    tops = []
+    for top in range(20):
+        subs = [node(top * 1000 + sub, f'Category {top} Sub {sub}', 2,
+                     [node(top * 1000 + sub * 10 + leaf + 100000, f'Leaf {top}-{sub}-{leaf} Widgets', 3)
+                      for leaf in range(5)])
+                for sub in range(10)]
+        tops.append(node(top, f'Category {top}', 1, subs))
+    return {'categoryTreeId': tree_id, 'categoryTreeVersion': '1', 'rootCategoryNode': node(0, 'Root', 0, tops)}
+
+
+def category_suggestions(tree_id, q):
+    return {
+        'categorySuggestions': [
+            {
+                'category': {'categoryId': str(9355 + n), 'categoryName': f'{q} category {n}'},
+                'categoryTreeNodeAncestors': [{'categoryId': '15032', 'categoryName': 'Cell Phones & Accessories',
+                                               'categoryTreeNodeLevel': 1}],
+                'categoryTreeNodeLevel': 2
+            }
+            for n in range(3)
+        ],
+        'categoryTreeId': tree_id,
+        'categoryTreeVersion': '1'
+    }
+
+
+class MockEbayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if not self._inject():
+            return
+        if urlsplit(self.path).path == '/identity/v1/oauth2/token':
+            self._json({'access_token': 'mock-token', 'expires_in': 7200, 'token_type': 'Application Access Token'})
+        else:
+            self._json({'errors': [{'message': 'Not found'}]}, 404)
+
+    def do_GET(self):
+        if not self._inject():
+            return
+        # Absolute URLs arrive when the stand-in is used as HTTP proxy for listing pages
+        url = urlsplit(self.path)
+        path = url.path
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+        if path == '/buy/browse/v1/item_summary/search':
+            limit = min(int(query.get('limit', 50)), 200)
+            offset = int(query.get('offset', 0))
+            q = query.get('q', '')
+            seed = int(hashlib.md5(q.encode()).hexdigest()[:6], 16)
+            count = max(0, min(limit, TOTAL_RESULTS - offset))
+            body = {
+                'total': TOTAL_RESULTS,
+                'offset': offset,
+                'limit': limit,
+                'itemSummaries': [item_summary(seed + offset + i, q) for i in range(count)]
+            }
+            if offset + count < TOTAL_RESULTS:
+                body['next'] = f'{path}?q={q}&limit={limit}&offset={offset + count}'
+            self._json(body)
+        elif path == '/buy/browse/v1/item/' and 'item_ids' in query:
+            self._json({'items': [item_detail(item_id) for item_id in query['item_ids'].split(',')]})
+        elif _ITEM_RE.match(path):
+            self._json(item_detail(_ITEM_RE.match(path).group(1)))
+        elif _SUGGESTIONS_RE.match(path):
+            self._json(category_suggestions(_SUGGESTIONS_RE.match(path).group(1), query.get('q', '')))
+        elif _CATEGORY_TREE_RE.match(path):
+            self._json(category_tree(_CATEGORY_TREE_RE.match(path).group(1)))
+        elif _LISTING_RE.match(path):
+            self._listing_page(int(_LISTING_RE.match(path).group(1)))
+        else:
+            self._json({'errors': [{'message': 'Not found'}]}, 404)
+
+    def _inject(self):
+        """Apply the configured latency; return False after sending an injected error"""
+        options = self.server.options
+        delay = options.latency + random.uniform(0, options.jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if options.error_rate and random.random() < options.error_rate:
+            self._json({'errors': [{'errorId': 2001, 'message': 'Injected failure'}]}, 503)
+            return False
+        return True
+
+    def _listing_page(self, item_id):
+        pages = self.server.pages
+        body = pages[item_id % len(pages)]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', 'text/html', {'ETag': etag})
+        else:
+            self._send(200, body, 'text/html; charset=utf-8', {'ETag': etag})
+
+    def _json(self, body, status=200):
+        self._send(status, json.dumps(body).encode(), 'application/json')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockEbayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def create_server(host='127.0.0.1', port=8081, latency=0, jitter=0, error_rate=0):
+    server = MockEbayServer((host, port), MockEbayHandler)
+    server.options = argparse.Namespace(latency=latency, jitter=jitter, error_rate=error_rate)
+    server.pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+        with open(path, 'rb') as f:
+            server.pages.append(f.read())
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the eBay APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0, help='added latency per request, ms')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra latency up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with a 503')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f'Mock eBay listening on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -12,15 +12,145 @@ class Config:
     # eBay API settings
     EBAY_APP_ID = os.environ.get('EBAY_APP_ID')
     EBAY_CLIENT_SECRET = os.environ.get('EBAY_CLIENT_SECRET')
-    EBAY_OAUTH_URL = 'https://api.ebay.com/identity/v1/oauth2/token'
-    EBAY_SEARCH_URL = 'https://api.ebay.com/buy/browse/v1/item_summary/search'
-    EBAY_ITEM_URL = 'https://api.ebay.com/buy/browse/v1/item/'
-    EBAY_CATEGORY_URL = 'https://api.ebay.com/commerce/taxonomy/v1/category_tree/0/get_category_suggestions'
+    EBAY_API_BASE_URL = os.environ.get('EBAY_API_BASE_URL', 'https://api.ebay.com').rstrip('/')  # e.g. a local stand-in for benchmarks
+    EBAY_OAUTH_URL = f'{EBAY_API_BASE_URL}/identity/v1/oauth2/token'
+    EBAY_OAUTH_SCOPE = 'https://api.ebay.com/oauth/api_scope'
+    EBAY_SEARCH_URL = f'{EBAY_API_BASE_URL}/buy/browse/v1/item_summary/search'
+    EBAY_ITEM_URL = f'{EBAY_API_BASE_URL}/buy/browse/v1/item/'
+    EBAY_CATEGORY_URL = EBAY_API_BASE_URL + '/commerce/taxonomy/v1/category_tree/{tree_id}/get_category_suggestions'
+    EBAY_CATEGORY_TREE_URL = EBAY_API_BASE_URL + '/commerce/taxonomy/v1/category_tree/{tree_id}'
+    EBAY_MARKETPLACE_ID = 'EBAY_US'  # used when a request does not name a marketplace
+    # Supported marketplaces and their default category tree IDs (get_default_category_tree_id)
+    EBAY_CATEGORY_TREE_IDS = {
+        'EBAY_US': '0',
+        'EBAY_CA': '2',
+        'EBAY_GB': '3',
+        'EBAY_AU': '15',
+        'EBAY_AT': '16',
+        'EBAY_FR': '71',
+        'EBAY_DE': '77',
+        'EBAY_IT': '101',
+        'EBAY_NL': '146',
+        'EBAY_ES': '186',
+        'EBAY_CH': '193',
+        'EBAY_IE': '205',
+        'EBAY_PL': '212'
+    }
+    # OAuth scope overrides per marketplace, e.g. "EBAY_DE=https://api.ebay.com/oauth/api_scope ..."
+    MARKETPLACE_OAUTH_SCOPES = dict(
+        (part.strip() for part in entry.split('=', 1))
+        for entry in os.environ.get('MARKETPLACE_OAUTH_SCOPES', '').split(';') if '=' in entry
+    )
+    
+    DOCS_ENABLED = os.environ.get('DOCS_ENABLED', 'true').lower() == 'true'  # Swagger UI at /apidocs
     
     # API settings
     DEFAULT_SEARCH_LIMIT = 5
+    PASSTHROUGH_ENABLED = os.environ.get('PASSTHROUGH_ENABLED', 'false').lower() == 'true'  # relay /search and /item bodies undecoded
+    SEARCH_STREAM_DEFAULT_LIMIT = 500  # results streamed by /search/stream when no limit is given
+    SEARCH_STREAM_PAGE_SIZE = 200  # Browse API maximum page size
+    SEARCH_MAX_OFFSET = 10000  # Browse API does not page past this many results
+    SEARCH_STATS_DEFAULT_LIMIT = 1000  # results aggregated by /search/stats when no limit is given
+    SEARCH_STATS_MAX_LIMIT = int(os.environ.get('SEARCH_STATS_MAX_LIMIT', 2000))  # one eBay call per 200 results
+    BATCH_MAX_ITEMS = 50  # item IDs accepted by POST /items
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 8))  # parallel eBay calls per batch
+    EBAY_GET_ITEMS_MAX_IDS = 20  # eBay's limit for one get_items call
     TOKEN_EXPIRY_BUFFER = 5 * 60  # 5 minutes in seconds
+    TOKEN_MIN_VALIDITY = 60  # requests only block on OAuth when less than this is left
+    TOKEN_REFRESH_RETRY_DELAY = 30  # seconds between failed background refreshes
+    TOKEN_SHARE_FILE = os.environ.get('TOKEN_SHARE_FILE')  # optional, shares the token across workers; created 0600, keep it out of shared dirs like /tmp
+
+    # Upstream HTTP client settings
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # number of hosts to keep pools for
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # keep-alive connections per host
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+    ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 200))  # in-flight upstream calls per ASGI worker
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))  # consecutive failures that open a breaker
+    CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30))  # seconds before a probe call is allowed
+
+    # Listing analysis settings
+    LISTING_PARSER = os.environ.get('LISTING_PARSER', 'fast')  # 'fast' streaming scan or 'soup' full parse
+    LISTING_CACHE_MAX_ENTRIES = int(os.environ.get('LISTING_CACHE_MAX_ENTRIES', 1024))
+    LISTING_CACHE_TTL = int(os.environ.get('LISTING_CACHE_TTL', 24 * 60 * 60))  # how long results and validators are kept
+    LISTING_REVALIDATE_AFTER = int(os.environ.get('LISTING_REVALIDATE_AFTER', 10 * 60))  # conditional GET after this age
+    LISTING_CONNECT_TIMEOUT = float(os.environ.get('LISTING_CONNECT_TIMEOUT', 3.05))
+    LISTING_READ_TIMEOUT = float(os.environ.get('LISTING_READ_TIMEOUT', 5))  # max wait between received chunks
+    LISTING_DOWNLOAD_TIMEOUT = float(os.environ.get('LISTING_DOWNLOAD_TIMEOUT', 15))  # whole-page deadline, answered with 504
+    LISTING_MAX_BYTES = int(os.environ.get('LISTING_MAX_BYTES', 3 * 1024 * 1024))
+    LISTING_CHUNK_SIZE = 64 * 1024
+    KEYWORD_LIMIT = 20
+    KEYWORD_TITLE_WEIGHT = float(os.environ.get('KEYWORD_TITLE_WEIGHT', 3.0))  # title terms count this many times
+    KEYWORD_IDF_PATH = os.environ.get('KEYWORD_IDF_PATH')  # optional JSON built by `python -m services.keywords`
+
+    # Logging settings
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FILE = os.environ.get('LOG_FILE', 'app.log')  # empty logs to stderr
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' (one object per line) or 'text'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))  # LOG_FILE is rotated at this size
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    LOG_ACCESS_SAMPLE_RATE = float(os.environ.get('LOG_ACCESS_SAMPLE_RATE', 1.0))  # share of successful requests logged
+    # Per-route overrides, e.g. "/search=0.1;/item=0.1"; errors and slow requests are always logged
+    LOG_ACCESS_SAMPLE_RATES = dict(
+        (route.strip(), float(rate))
+        for route, rate in (entry.split('=', 1) for entry in os.environ.get('LOG_ACCESS_SAMPLE_RATES', '/metrics=0').split(';') if '=' in entry)
+    )
+    LOG_SLOW_REQUEST = float(os.environ.get('LOG_SLOW_REQUEST', 1.0))  # seconds
+    LOG_MAX_QUERY_LENGTH = 200
+
+    # Response compression settings
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as-is
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5  # used when the optional brotli package is installed
+
+    # Local category index, answers /category without calling get_category_suggestions
+    CATEGORY_INDEX_ENABLED = os.environ.get('CATEGORY_INDEX_ENABLED', 'false').lower() == 'true'
+    CATEGORY_INDEX_REFRESH = int(os.environ.get('CATEGORY_INDEX_REFRESH', 24 * 60 * 60))  # seconds between tree downloads
+    CATEGORY_INDEX_RETRY_DELAY = 5 * 60  # seconds before retrying a failed download
+    CATEGORY_INDEX_MIN_CONFIDENCE = float(os.environ.get('CATEGORY_INDEX_MIN_CONFIDENCE', 0.75))  # below it the live API answers
+    CATEGORY_INDEX_MAX_SUGGESTIONS = 10
+    CATEGORY_TREE_FILE = os.environ.get('CATEGORY_TREE_FILE')  # optional, shares the downloaded tree across workers; created 0600
+
+    # Response cache settings
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2048))
+    CACHE_TTLS = {  # seconds per endpoint
+        'search': int(os.environ.get('CACHE_TTL_SEARCH', 5 * 60)),
+        'item': int(os.environ.get('CACHE_TTL_ITEM', 15 * 60)),
+        'category': int(os.environ.get('CACHE_TTL_CATEGORY', 24 * 60 * 60))
+    }
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # optional, shares the cache across workers
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')  # optional on-disk cache, kept across restarts (used without Redis)
+    CACHE_SQLITE_MAX_MB = int(os.environ.get('CACHE_SQLITE_MAX_MB', 256))  # compaction evicts entries above this size
+    CACHE_SQLITE_COMPACT_INTERVAL = int(os.environ.get('CACHE_SQLITE_COMPACT_INTERVAL', 5 * 60))  # seconds between compactions
+    CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', 60 * 60))  # how long expired entries stay usable as a fallback
+    CACHE_REFRESH_WORKERS = 2  # threads refreshing stale entries in the background
+
+    # Cache warmer, keeps the most requested searches and items cached
+    CACHE_WARM_ENABLED = os.environ.get('CACHE_WARM_ENABLED', 'false').lower() == 'true'
+    CACHE_WARM_TOP_N = int(os.environ.get('CACHE_WARM_TOP_N', 100))  # popular searches and items tracked per worker
+    CACHE_WARM_MIN_HITS = int(os.environ.get('CACHE_WARM_MIN_HITS', 3))  # requests before a key is worth warming
+    CACHE_WARM_INTERVAL = int(os.environ.get('CACHE_WARM_INTERVAL', 60))  # seconds between warming rounds
+    CACHE_WARM_MAX_CALLS = int(os.environ.get('CACHE_WARM_MAX_CALLS', 20))  # eBay calls one round may spend
+    CACHE_WARM_HALF_LIFE = int(os.environ.get('CACHE_WARM_HALF_LIFE', 60 * 60))  # seconds for request counts to halve
+    CACHE_WARM_SKETCH_WIDTH = 4096  # count-min sketch counters per row
+    CACHE_WARM_SKETCH_DEPTH = 4
+    CACHE_WARM_FILE = os.environ.get('CACHE_WARM_FILE')  # optional, keeps popular keys across restarts and workers; created 0600
     
     # Security settings
     RATE_LIMIT = '100 per minute'
+    # memory:// keeps counters per worker; use e.g. redis://host:6379 to share them across workers and hosts
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    API_KEY_HEADER = 'X-API-Key'
+    # Per-key limits, e.g. "key1=300 per minute;key2=1000 per minute". Keyed clients skip the per-route limits
+    API_KEY_LIMITS = dict(
+        (part.strip() for part in entry.split('=', 1))
+        for entry in os.environ.get('API_KEY_LIMITS', '').split(';') if '=' in entry
+    )
+
+    # Daily eBay API call budget shared through RATELIMIT_STORAGE_URI (0 disables it)
+    EBAY_DAILY_CALL_QUOTA = int(os.environ.get('EBAY_DAILY_CALL_QUOTA', 5000))
+    EBAY_QUOTA_RESERVE = float(os.environ.get('EBAY_QUOTA_RESERVE', 0.1))  # share of the quota kept back; below it stale cache is preferred
     CORS_ORIGINS = ['https://chat.openai.com']  # Update to your GPT's domain in production
@@ -8,7 +8,6 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 from flasgger import Swagger
 import base64
-from bs4 import BeautifulSoup
 import re
 
 # Load environment variables
@@ -280,6 +279,8 @@ def analyze_listing():
         if response.status_code != 200:
             return jsonify({"error": "Listing URL not available or removed"}), 400
 
+        from bs4 import BeautifulSoup  # imported on first use, it is slow to load
+
         soup = BeautifulSoup(response.text, "html.parser")
         title = soup.find("h1")
         desc_div = soup.find("div", id="desc_div") or soup.find("div", id="viTabs_0_is")
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+
+import httpx
+
+from config import Config
+from services.cache import cache_status, make_cache_key
+from services.circuit_breaker import get_breaker
+from services.coalescing import AsyncSingleFlight
+from services.ebay_service import CachePolicy, to_api_error
+from utils.error_handlers import EbayApiError
+from utils.metrics import UPSTREAM_COALESCED, observe_upstream
+
+logger = logging.getLogger(__name__)
+
+
+def create_async_client():
+    """Build the shared non-blocking upstream client with keep-alive pooling"""
+    limits = httpx.Limits(
+        max_connections=Config.ASYNC_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_POOL_MAXSIZE
+    )
+    # httpx transports only retry failed connection attempts, matching the sync client
+    transport = httpx.AsyncHTTPTransport(retries=Config.HTTP_MAX_RETRIES, limits=limits)
+    timeout = httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+class AsyncEbayService:
+    """
+    Non-blocking client for the eBay Browse and Taxonomy APIs, used by the ASGI app.
+    Shares the token manager, response cache and CachePolicy with the sync
+    service; the token is read without blocking and only fetched in a thread
+    when missing. Cache and call budget lookups may reach Redis or SQLite, so
+    they run in threads as well.
+    """
+
+    def __init__(self, tokens, cache=None, client=None, budget=None, category_index=None):
+        self.tokens = tokens
+        self.cache = cache
+        self.client = client or create_async_client()
+        self.budget = budget
+        self.cache_policy = CachePolicy(cache, budget)
+        self.category_index = category_index
+        # Other marketplaces get their own connection pool, created on first use
+        self._clients = {Config.EBAY_MARKETPLACE_ID: self.client}
+        self._inflight = AsyncSingleFlight()
+        self._refreshing = {}
+
+    async def get_token(self, marketplace=None):
+        tokens = self.tokens.for_marketplace(marketplace)
+        token = tokens.peek()
+        if token is None:
+            token = await asyncio.to_thread(tokens.get_token)
+        return token
+
+    def _client_for(self, marketplace):
+        client = self._clients.get(marketplace)
+        if client is None:
+            client = self._clients[marketplace] = create_async_client()
+        return client
+
+    async def _get(self, endpoint, url, error_message, params, marketplace):
+        """Authenticated GET returning the JSON body; identical in-flight calls are joined"""
+        key = (url, make_cache_key(endpoint, marketplace, params or {}))
+        result, shared = await self._inflight.do(
+            key, lambda: self._fetch_json(endpoint, url, error_message, params, marketplace))
+        if shared:
+            UPSTREAM_COALESCED.inc(endpoint=endpoint)
+        return result
+
+    async def _fetch_json(self, endpoint, url, error_message, params, marketplace):
+        headers = {
+            'Authorization': f'Bearer {await self.get_token(marketplace)}',
+            'X-EBAY-C-MARKETPLACE-ID': marketplace
+        }
+        breaker = get_breaker(endpoint)
+        breaker.before_call()
+        if self.budget is not None:
+            await asyncio.to_thread(self.budget.consume)
+
+        with observe_upstream(endpoint, marketplace) as call:
+            try:
+                response = await self._client_for(marketplace).get(url, headers=headers, params=params)
+                call['status'] = response.status_code
+                response.raise_for_status()
+                result = response.json()
+            except httpx.HTTPError as e:
+                error = to_api_error(e, error_message)
+                breaker.record(error)
+                raise error
+        breaker.record_success()
+        return result
+
+    async def _cached_get(self, endpoint, cache_params, url, error_message, params=None, marketplace=None):
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        if self.cache is None:
+            return await self._get(endpoint, url, error_message, params, marketplace)
+
+        key = make_cache_key(endpoint, marketplace, cache_params)
+        result, status, refresh = await asyncio.to_thread(self.cache_policy.lookup, endpoint, key)
+        if result is not None:
+            cache_status.set(status)
+            if refresh and key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(
+                    self._refresh(endpoint, key, url, error_message, params, marketplace))
+            return result
+
+        try:
+            result = await self._get(endpoint, url, error_message, params, marketplace)
+        except EbayApiError as e:
+            result = await asyncio.to_thread(self.cache_policy.fallback, endpoint, key, e)
+            if result is None:
+                raise
+            cache_status.set('stale')
+            return result
+
+        cache_status.set('miss')
+        await asyncio.to_thread(self.cache.set, endpoint, key, result)
+        return result
+
+    async def _refresh(self, endpoint, key, url, error_message, params, marketplace):
+        try:
+            result = await self._get(endpoint, url, error_message, params, marketplace)
+            await asyncio.to_thread(self.cache.set, endpoint, key, result)
+        except EbayApiError as e:
+            logger.info(f'Background refresh of {key} failed: {e.message}')
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def search_products(self, q, limit, marketplace=None):
+        params = {
+            'q': q,
+            'limit': limit
+        }
+        return await self._cached_get('search', params, Config.EBAY_SEARCH_URL,
+                                      'Error searching eBay products', params=params, marketplace=marketplace)
+
+    async def get_item_details(self, item_id, marketplace=None):
+        return await self._cached_get('item', {'id': item_id}, f'{Config.EBAY_ITEM_URL}{item_id}',
+                                      'Error getting eBay item details', marketplace=marketplace)
+
+    async def suggest_category(self, q, marketplace=None):
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        # The local index holds the default marketplace's tree only
+        if self.category_index is not None and marketplace == Config.EBAY_MARKETPLACE_ID:
+            suggestions = self.category_index.suggest(q)
+            if suggestions is not None:
+                return suggestions
+
+        params = {
+            'q': q
+        }
+        url = Config.EBAY_CATEGORY_URL.format(tree_id=Config.EBAY_CATEGORY_TREE_IDS[marketplace])
+        return await self._cached_get('category', params, url,
+                                      'Error suggesting eBay category', params=params, marketplace=marketplace)
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
@@ -0,0 +1,351 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from config import Config
+from services.http_client import RawPayload
+
+try:
+    import redis
+except ImportError:  # shared backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# How the current request's upstream data was served: 'hit', 'miss' or 'stale'
+cache_status = contextvars.ContextVar('cache_status', default=None)
+
+
+def normalize_query(q):
+    """Lower-case a search string and collapse runs of whitespace"""
+    return _WHITESPACE_RE.sub(' ', q.strip().lower())
+
+
+def make_cache_key(endpoint, marketplace, params):
+    """
+    Build a stable cache key for an upstream call.
+    Params are sorted and `q` is normalized so equivalent requests share an entry.
+    """
+    items = []
+    for name, value in sorted(params.items()):
+        if name == 'q':
+            value = normalize_query(str(value))
+        items.append((name, str(value).strip()))
+    return f'{endpoint}|{marketplace}|{urlencode(items)}'
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with per-entry TTL and LRU eviction.
+    Expired entries are kept for stale_ttl more seconds so they can still be
+    served with allow_stale=True.
+    """
+
+    def __init__(self, max_entries, stale_ttl=0):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            now = time.time()
+            if expires_at <= now:
+                if expires_at + self.stale_ttl <= now:
+                    del self._data[key]
+                    return None
+                if not allow_stale:
+                    return None
+            self._data.move_to_end(key)
+            return value
+
+    def expires_in(self, key):
+        """Seconds until a fresh entry expires, or None when it is missing or already expired"""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[0] - time.time()
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _encode_entry(value, expires_at):
+    """Serialize a cache value with its expiry; RawPayload bodies are stored as-is"""
+    if isinstance(value, RawPayload):
+        header = json.dumps([expires_at, value.content_type, value.content_encoding]).encode()
+        return b'R' + header + b'\n' + value.body
+    return b'J' + json.dumps([expires_at]).encode() + b'\n' + json.dumps(value).encode()
+
+
+def _decode_entry(data):
+    """Return (expires_at, value) for bytes written by _encode_entry"""
+    header, body = data[1:].split(b'\n', 1)
+    header = json.loads(header)
+    if data[:1] == b'R':
+        return header[0], RawPayload(body, header[1], header[2])
+    return header[0], json.loads(body)
+
+
+class RedisCache:
+    """
+    Cache backend stored in Redis so every gunicorn worker shares entries.
+    get() returns (expires_at, value), so a copy kept elsewhere can expire
+    at the same time.
+    """
+
+    def __init__(self, url, prefix='ebay-proxy:', stale_ttl=0):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+
+    def get(self, key, allow_stale=False):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        expires_at, value = _decode_entry(raw)
+        if expires_at <= time.time() and not allow_stale:
+            return None
+        return expires_at, value
+
+    def expires_in(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        expires_at = json.loads(raw[1:].split(b'\n', 1)[0])[0]
+        return expires_at - time.time() if expires_at > time.time() else None
+
+    def set(self, key, value, ttl):
+        # The key outlives the entry's TTL by stale_ttl; the header records when it goes stale
+        data = _encode_entry(value, time.time() + ttl)
+        self.client.setex(self.prefix + key, int(ttl + self.stale_ttl), data)
+
+
+class SQLiteCache:
+    """
+    Cache backend in a local SQLite file, kept across restarts and shared by
+    the worker processes on one host. The database runs in WAL mode, so
+    readers never wait for a writer and concurrent writers wait up to
+    busy_timeout for each other. Each process (and thread) opens its own
+    connection, as connections must not be carried across a fork.
+
+    Every `compact_interval` seconds a writer deletes entries past their
+    stale window and, when the stored values exceed `max_bytes`, the entries
+    closest to expiry, then returns the freed pages to the file system.
+    Like RedisCache, get() returns (expires_at, value).
+    """
+
+    def __init__(self, path, stale_ttl=0, max_bytes=None, compact_interval=None):
+        self.path = path
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes or Config.CACHE_SQLITE_MAX_MB * 1024 * 1024
+        self.compact_interval = compact_interval or Config.CACHE_SQLITE_COMPACT_INTERVAL
+        self._local = threading.local()
+        self._compacted_at = time.time()
+        self._compact_lock = threading.Lock()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # auto_vacuum only takes effect on a new database, before the table exists
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, expires_at REAL NOT NULL, purge_at REAL NOT NULL, '
+                'size INTEGER NOT NULL, data BLOB NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_purge_at ON entries (purge_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)')
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def get(self, key, allow_stale=False):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at, data FROM entries WHERE key = ? AND purge_at > ?', (key, now)).fetchone()
+        if row is None or (row[0] <= now and not allow_stale):
+            return None
+        return _decode_entry(row[1])
+
+    def expires_in(self, key):
+        row = self._connection().execute('SELECT expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        return row[0] - time.time()
+
+    def set(self, key, value, ttl):
+        expires_at = time.time() + ttl
+        data = _encode_entry(value, expires_at)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO entries (key, expires_at, purge_at, size, data) VALUES (?, ?, ?, ?, ?)',
+            (key, expires_at, expires_at + self.stale_ttl, len(data), data)
+        )
+        if time.time() - self._compacted_at >= self.compact_interval:
+            self._compact()
+
+    def _compact(self):
+        if not self._compact_lock.acquire(blocking=False):
+            return
+        try:
+            self._compacted_at = time.time()
+            conn = self._connection()
+            removed = conn.execute('DELETE FROM entries WHERE purge_at <= ?', (time.time(),)).rowcount
+            # Evict the entries closest to expiry until the values fit in 90% of max_bytes
+            excess = (conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+                      - int(self.max_bytes * 0.9))
+            while excess > 0:
+                count, size = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM '
+                    '(SELECT size FROM entries ORDER BY expires_at LIMIT 100)').fetchone()
+                if not count:
+                    break
+                conn.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT 100)')
+                removed += count
+                excess -= size
+            conn.execute('PRAGMA incremental_vacuum')
+            if removed:
+                logger.info(f'Compacted cache file {self.path}: {removed} entries removed')
+        finally:
+            self._compact_lock.release()
+
+
+class ResponseCache:
+    """
+    Response cache in front of the eBay APIs.
+    Entries live in a bounded local LRU and, when configured, in a shared
+    backend that is consulted on local misses.
+    """
+
+    def __init__(self, max_entries=None, ttls=None, shared=None, stale_ttl=None):
+        if stale_ttl is None:
+            stale_ttl = Config.CACHE_STALE_TTL
+        self.local = TTLCache(max_entries or Config.CACHE_MAX_ENTRIES, stale_ttl)
+        self.ttls = ttls or Config.CACHE_TTLS
+        self.shared = shared
+        self.hits = {}
+        self.misses = {}
+        self.stale = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter, endpoint):
+        with self._lock:
+            counter[endpoint] = counter.get(endpoint, 0) + 1
+
+    def get(self, endpoint, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f'Shared cache read failed: {str(e)}')
+                entry = None
+            if entry is not None:
+                expires_at, value = entry
+                # The local copy expires with the shared entry, not a full TTL after this read
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    self.local.set(key, value, remaining)
+
+        self._count(self.hits if value is not None else self.misses, endpoint)
+        return value
+
+    def get_stale(self, endpoint, key):
+        """Return an entry even if its TTL has passed, as long as it is within the stale window"""
+        value = self.local.get(key, allow_stale=True)
+        if value is None and self.shared is not None:
+            try:
+                entry = self.shared.get(key, allow_stale=True)
+            except Exception as e:
+                logger.warning(f'Shared cache read failed: {str(e)}')
+                entry = None
+            value = entry[1] if entry is not None else None
+
+        if value is not None:
+            self._count(self.stale, endpoint)
+        return value
+
+    def expires_in(self, endpoint, key):
+        """Seconds until an entry expires, or None when it is missing or already expired"""
+        remaining = self.local.expires_in(key)
+        if remaining is None and self.shared is not None:
+            try:
+                remaining = self.shared.expires_in(key)
+            except Exception as e:
+                logger.warning(f'Shared cache read failed: {str(e)}')
+        return remaining
+
+    def set(self, endpoint, key, value):
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception as e:
+                logger.warning(f'Shared cache write failed: {str(e)}')
+
+    def stats(self):
+        """Return hit/miss/stale counters per endpoint"""
+        with self._lock:
+            endpoints = set(self.hits) | set(self.misses) | set(self.stale)
+            return {
+                endpoint: {
+                    'hits': self.hits.get(endpoint, 0),
+                    'misses': self.misses.get(endpoint, 0),
+                    'stale': self.stale.get(endpoint, 0)
+                }
+                for endpoint in sorted(endpoints)
+            }
+
+
+def create_persistent_cache(stale_ttl=0):
+    """Build the SQLite backend when CACHE_SQLITE_PATH is set, otherwise return None"""
+    if not Config.CACHE_SQLITE_PATH:
+        return None
+    return SQLiteCache(Config.CACHE_SQLITE_PATH, stale_ttl=stale_ttl)
+
+
+def create_response_cache():
+    """Build the response cache from Config, or return None when caching is disabled"""
+    if not Config.CACHE_ENABLED:
+        return None
+
+    shared = None
+    if Config.CACHE_REDIS_URL:
+        if redis is None:
+            logger.warning('CACHE_REDIS_URL is set but the redis package is not installed; using local cache only')
+        else:
+            shared = RedisCache(Config.CACHE_REDIS_URL, stale_ttl=Config.CACHE_STALE_TTL)
+    if shared is None:
+        shared = create_persistent_cache(stale_ttl=Config.CACHE_STALE_TTL)
+    return ResponseCache(shared=shared)
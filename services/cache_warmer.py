@@ -0,0 +1,217 @@
+"""
+Background warmer for the most requested searches and items.
+
+/search and /item requests are counted in a count-min sketch; the keys
+with the highest estimates (CACHE_WARM_TOP_N of them) are kept as heavy
+hitters. Every CACHE_WARM_INTERVAL seconds a background thread refetches
+the hottest entries that are missing from the cache or would expire before
+the next round, spending at most CACHE_WARM_MAX_CALLS eBay calls and none
+once the daily call budget is down to its reserve. Counts halve every
+CACHE_WARM_HALF_LIFE seconds so the ranking follows current traffic. With
+CACHE_WARM_FILE set the heavy hitters are saved there, so a restarted or
+newly forked worker starts warming with its first request instead of
+waiting for traffic to rebuild the counts.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from urllib.parse import parse_qsl
+
+from config import Config
+from services.cache import make_cache_key
+from utils.error_handlers import EbayApiError
+from utils.metrics import CACHE_WARM_CALLS
+from utils.shared_file import WorkerThread, locked_file, write_json
+
+logger = logging.getLogger(__name__)
+
+WARMED_ENDPOINTS = ('search', 'item')
+
+
+class CountMinSketch:
+    """Fixed-size frequency estimates; a count is never underestimated"""
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('L', bytes(width * array('L').itemsize)) for _ in range(depth)]
+
+    def _slots(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Count key and return its new estimate (conservative update)"""
+        slots = self._slots(key)
+        estimate = min(row[slot] for row, slot in zip(self.rows, slots)) + count
+        for row, slot in zip(self.rows, slots):
+            if row[slot] < estimate:
+                row[slot] = estimate
+        return estimate
+
+    def estimate(self, key):
+        return min(row[slot] for row, slot in zip(self.rows, self._slots(key)))
+
+    def halve(self):
+        self.rows = [array('L', (count >> 1 for count in row)) for row in self.rows]
+
+
+class HeavyHitters:
+    """The `capacity` keys with the highest count-min estimates"""
+
+    def __init__(self, capacity, width, depth):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.top = {}  # key -> estimate
+        self._lock = threading.Lock()
+
+    def add(self, key, count=1):
+        with self._lock:
+            estimate = self.sketch.add(key, count)
+            if key in self.top or len(self.top) < self.capacity:
+                self.top[key] = estimate
+                return
+            coldest = min(self.top, key=self.top.get)
+            if estimate > self.top[coldest]:
+                del self.top[coldest]
+                self.top[key] = estimate
+
+    def discard(self, key):
+        with self._lock:
+            self.top.pop(key, None)
+
+    def halve(self):
+        with self._lock:
+            self.sketch.halve()
+            self.top = {key: count >> 1 for key, count in self.top.items() if count > 1}
+
+    def most_common(self):
+        """Return [(key, estimate)], hottest first"""
+        with self._lock:
+            return sorted(self.top.items(), key=lambda entry: entry[1], reverse=True)
+
+
+class CacheWarmer:
+    """
+    Tracks popular searches and items and keeps them cached.
+    `raw` selects the pass-through cache entries (PASSTHROUGH_ENABLED) instead
+    of the decoded ones. The warming thread runs in each worker process.
+    """
+
+    def __init__(self, service, raw=False, key_file=None):
+        self.service = service
+        self.raw = raw
+        self.key_file = key_file if key_file is not None else Config.CACHE_WARM_FILE
+        self.hitters = HeavyHitters(Config.CACHE_WARM_TOP_N, Config.CACHE_WARM_SKETCH_WIDTH,
+                                    Config.CACHE_WARM_SKETCH_DEPTH)
+        self.halved_at = time.time()
+        self._worker = WorkerThread(self._warm_loop, 'ebay-cache-warmer')
+        self._load_keys()
+
+    def record_search(self, q, limit, marketplace):
+        self._record(make_cache_key('search', marketplace, {'q': q, 'limit': limit}))
+
+    def record_item(self, item_id, marketplace):
+        self._record(make_cache_key('item', marketplace, {'id': item_id}))
+
+    def _record(self, key):
+        self.hitters.add(key)
+        self.start()
+
+    def start(self):
+        self._worker.ensure_started()
+
+    def warm_once(self):
+        """Refresh the hottest entries that are missing or about to expire; return the eBay calls made"""
+        budget = self.service.budget
+        if budget is not None and budget.near_exhaustion():
+            logger.info('Cache warming skipped: eBay call budget is in its reserve')
+            return 0
+
+        calls = 0
+        for key, count in self.hitters.most_common():
+            if calls >= Config.CACHE_WARM_MAX_CALLS or count < Config.CACHE_WARM_MIN_HITS:
+                break
+            endpoint, marketplace, query = key.split('|', 2)
+            try:
+                warmed = self.service.warm(endpoint, dict(parse_qsl(query)), marketplace, raw=self.raw,
+                                           within=Config.CACHE_WARM_INTERVAL)
+            except EbayApiError as e:
+                CACHE_WARM_CALLS.inc(endpoint=endpoint, result='error')
+                calls += 1
+                if e.status_code < 500:
+                    # The item is gone or the query is rejected; stop warming it
+                    self.hitters.discard(key)
+                    continue
+                logger.info(f'Cache warming stopped after {calls} calls: {e.message}')
+                break
+            if warmed:
+                CACHE_WARM_CALLS.inc(endpoint=endpoint, result='ok')
+                calls += 1
+        return calls
+
+    def _warm_loop(self):
+        while True:
+            try:
+                calls = self.warm_once()
+                if calls:
+                    logger.info(f'Cache warming refreshed {calls} entries')
+            except Exception as e:
+                logger.warning(f'Cache warming failed: {str(e)}')
+
+            if time.time() - self.halved_at >= Config.CACHE_WARM_HALF_LIFE:
+                self.hitters.halve()
+                self.halved_at = time.time()
+            try:
+                self._save_keys()
+            except OSError as e:
+                logger.warning(f'Saving popular cache keys failed: {str(e)}')
+            time.sleep(Config.CACHE_WARM_INTERVAL)
+
+    def _load_keys(self):
+        if not self.key_file or not os.path.exists(self.key_file):
+            return
+        try:
+            with open(self.key_file) as f:
+                counts = _decayed_counts(f.read())
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f'Loading popular cache keys failed: {str(e)}')
+            return
+        for key, count in counts.items():
+            if count >= 1 and key.split('|', 1)[0] in WARMED_ENDPOINTS:
+                self.hitters.add(key, int(count))
+
+    def _save_keys(self):
+        """Merge this worker's heavy hitters into the key file, keeping the highest count per key"""
+        if not self.key_file:
+            return
+        with locked_file(self.key_file) as f:
+            try:
+                counts = _decayed_counts(f.read())
+            except (ValueError, KeyError):
+                counts = {}  # empty or partial file; rewritten below
+            for key, count in self.hitters.most_common():
+                counts[key] = max(count, counts.get(key, 0))
+            top = sorted(counts.items(), key=lambda entry: entry[1], reverse=True)[:Config.CACHE_WARM_TOP_N]
+            write_json(f, {'saved_at': time.time(), 'counts': dict(top)})
+
+
+def _decayed_counts(text):
+    """Counts from a key file, aged by CACHE_WARM_HALF_LIFE since it was saved"""
+    if not text:
+        return {}
+    data = json.loads(text)
+    factor = 0.5 ** (max(0, time.time() - data['saved_at']) / Config.CACHE_WARM_HALF_LIFE)
+    return {key: count * factor for key, count in data['counts'].items()}
+
+
+def create_cache_warmer(service, raw=None):
+    """Build the cache warmer from Config, or return None when it or the cache is disabled"""
+    if not Config.CACHE_WARM_ENABLED or service.cache is None:
+        return None
+    # The warming thread starts with the first recorded request, so the app can be preloaded before forking
+    return CacheWarmer(service, raw=Config.PASSTHROUGH_ENABLED if raw is None else raw)
@@ -0,0 +1,104 @@
+import logging
+import math
+import threading
+import time
+
+from config import Config
+from utils.error_handlers import EbayApiError
+from utils.metrics import CIRCUIT_OPENED
+
+logger = logging.getLogger(__name__)
+
+# Upstream call names that share a breaker with another endpoint
+BREAKER_NAMES = {
+    'item_group': 'item',
+    'category': 'taxonomy',
+    'category_tree': 'taxonomy'
+}
+
+
+class CircuitOpenError(EbayApiError):
+    """Raised instead of calling eBay while an endpoint's breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast after repeated upstream failures.
+    After CIRCUIT_FAILURE_THRESHOLD consecutive failures the breaker opens and
+    calls raise CircuitOpenError for CIRCUIT_RESET_TIMEOUT seconds. Then a
+    single probe call is let through: success closes the breaker, failure
+    opens it again. A probe that never reports back is replaced by another
+    one after the same timeout.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or Config.CIRCUIT_RESET_TIMEOUT
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_closed(self):
+        return self.state == self.CLOSED
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == self.CLOSED:
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            retry_after = self.opened_at + self.reset_timeout - now
+            if retry_after <= 0:
+                # Let this call through as the probe
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return
+        raise CircuitOpenError(f'eBay {self.name} API is temporarily unavailable', 503,
+                               retry_after=max(1, math.ceil(retry_after)))
+
+    def record_success(self):
+        if self.state == self.CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f'Circuit for eBay {self.name} API closed')
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                CIRCUIT_OPENED.inc(endpoint=self.name)
+                logger.warning(f'Circuit for eBay {self.name} API opened after {self.failures} failures')
+
+    def record(self, error=None):
+        """Record a call's outcome; only server errors, timeouts and connection failures count"""
+        if error is None or error.status_code < 500:
+            self.record_success()
+        else:
+            self.record_failure()
+
+
+# Breakers by name, created on first use
+breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """Return the process-wide breaker guarding an upstream endpoint"""
+    name = BREAKER_NAMES.get(endpoint, endpoint)
+    breaker = breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
@@ -0,0 +1,427 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from config import Config
+from services.cache import cache_status, create_response_cache, make_cache_key
+from services.circuit_breaker import get_breaker
+from services.coalescing import SingleFlight
+from services.http_client import RawPayload, get_upstream_client
+from services.taxonomy_index import create_taxonomy_index
+from services.token_manager import TokenManager
+from services.upstream_budget import create_upstream_budget
+from utils.error_handlers import EbayApiError
+from utils.metrics import UPSTREAM_COALESCED, observe_upstream
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy:
+    """
+    Decides what a cached eBay call answers with, for EbayService and
+    AsyncEbayService alike; the services only differ in how they call eBay.
+    An expired entry still in the stale window is served instead of calling
+    eBay when the daily call budget is running low, or when the endpoint's
+    circuit breaker is open (the caller then refreshes it in the background),
+    and instead of a call that failed with a server error.
+    The methods may block on a shared cache or the budget storage.
+    """
+
+    def __init__(self, cache, budget):
+        self.cache = cache
+        self.budget = budget
+
+    def lookup(self, endpoint, key):
+        """Return (result, cache status, refresh in background), or (None, None, False) when eBay must be called"""
+        result = self.cache.get(endpoint, key)
+        if result is not None:
+            return result, 'hit', False
+
+        conserving = self.budget is not None and self.budget.near_exhaustion()
+        failing = not get_breaker(endpoint).is_closed
+        if conserving or failing:
+            result = self.cache.get_stale(endpoint, key)
+            if result is not None:
+                return result, 'stale', not conserving
+        return None, None, False
+
+    def fallback(self, endpoint, key, error):
+        """Return the stale entry answering a failed call, or None when the error must be raised"""
+        if error.status_code < 500:
+            return None
+        return self.cache.get_stale(endpoint, key)
+
+
+class EbayService:
+    """Client for the eBay Browse and Taxonomy APIs"""
+
+    def __init__(self, client=None, cache=None, budget=None, tokens=None):
+        self.client = client or get_upstream_client()
+        self.cache = cache if cache is not None else create_response_cache()
+        self.budget = budget if budget is not None else create_upstream_budget()
+        self.tokens = tokens or TokenManager(self.client)
+        self.category_index = create_taxonomy_index(self.get_category_tree)
+        self.cache_policy = CachePolicy(self.cache, self.budget)
+        self._inflight = SingleFlight()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=Config.CACHE_REFRESH_WORKERS,
+                                                thread_name_prefix='ebay-cache-refresh')
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    def get_token(self, marketplace=None):
+        """Return a valid eBay OAuth access token"""
+        return self.tokens.for_marketplace(marketplace).get_token()
+
+    def _get(self, endpoint, url, error_message, params=None, marketplace=None):
+        """
+        Perform an authenticated GET against the eBay API and return the JSON body.
+        An identical call already in flight is joined instead of sent again.
+        """
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        return self._coalesced('json', endpoint, url, params, marketplace,
+                               lambda: self._fetch_json(endpoint, url, error_message, params, marketplace))
+
+    def _get_raw(self, endpoint, url, error_message, params=None, marketplace=None):
+        """Perform an authenticated GET and return the body bytes without decoding them"""
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        return self._coalesced('raw', endpoint, url, params, marketplace,
+                               lambda: self._fetch_raw(endpoint, url, error_message, params, marketplace))
+
+    def _coalesced(self, kind, endpoint, url, params, marketplace, fetch):
+        key = (kind, url, make_cache_key(endpoint, marketplace, params or {}))
+        result, shared = self._inflight.do(key, fetch)
+        if shared:
+            UPSTREAM_COALESCED.inc(endpoint=endpoint)
+        return result
+
+    def _fetch_json(self, endpoint, url, error_message, params, marketplace):
+        headers = {
+            'Authorization': f'Bearer {self.get_token(marketplace)}',
+            'X-EBAY-C-MARKETPLACE-ID': marketplace
+        }
+        breaker = get_breaker(endpoint)
+        breaker.before_call()
+        if self.budget is not None:
+            self.budget.consume()
+
+        with observe_upstream(endpoint, marketplace) as call:
+            try:
+                # Each marketplace gets its own connection pool
+                response = self.client.get(url, headers=headers, params=params, pool=marketplace)
+                call['status'] = response.status_code
+                response.raise_for_status()
+                result = response.json()
+            except requests.exceptions.RequestException as e:
+                error = to_api_error(e, error_message)
+                breaker.record(error)
+                raise error
+        breaker.record_success()
+        return result
+
+    def _fetch_raw(self, endpoint, url, error_message, params, marketplace):
+        headers = {
+            'Authorization': f'Bearer {self.get_token(marketplace)}',
+            'X-EBAY-C-MARKETPLACE-ID': marketplace,
+            'Accept-Encoding': 'gzip'
+        }
+        breaker = get_breaker(endpoint)
+        breaker.before_call()
+        if self.budget is not None:
+            self.budget.consume()
+
+        with observe_upstream(endpoint, marketplace) as call:
+            try:
+                response = self.client.get(url, headers=headers, params=params, stream=True, pool=marketplace)
+                call['status'] = response.status_code
+                response.raise_for_status()
+                # Read the body as sent, leaving any gzip encoding in place
+                result = RawPayload(
+                    response.raw.read(decode_content=False),
+                    response.headers.get('Content-Type', 'application/json'),
+                    response.headers.get('Content-Encoding')
+                )
+            except requests.exceptions.RequestException as e:
+                error = to_api_error(e, error_message)
+                breaker.record(error)
+                raise error
+        breaker.record_success()
+        return result
+
+    def _cached_get_raw(self, endpoint, cache_params, url, error_message, params=None, marketplace=None):
+        """Pass-through variant of _cached_get returning a RawPayload"""
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        return self._cached_call(endpoint, cache_params, marketplace, raw=True,
+                                 fetch=lambda: self._get_raw(endpoint, url, error_message, params, marketplace))
+
+    def _cached_get(self, endpoint, cache_params, url, error_message, params=None, marketplace=None):
+        """Serve a GET from the response cache, calling eBay only on a miss"""
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        return self._cached_call(endpoint, cache_params, marketplace,
+                                 fetch=lambda: self._get(endpoint, url, error_message, params, marketplace))
+
+    def _cached_call(self, endpoint, cache_params, marketplace, fetch, raw=False):
+        """Return a cached result or call fetch() and cache what it returns, falling back as CachePolicy decides"""
+        if self.cache is None:
+            return fetch()
+
+        key = self._cache_key(endpoint, cache_params, marketplace, raw)
+        result, status, refresh = self.cache_policy.lookup(endpoint, key)
+        if result is not None:
+            cache_status.set(status)
+            if refresh:
+                self._refresh_in_background(endpoint, key, fetch)
+            return result
+
+        try:
+            result = fetch()
+        except EbayApiError as e:
+            result = self.cache_policy.fallback(endpoint, key, e)
+            if result is None:
+                raise
+            cache_status.set('stale')
+            return result
+
+        cache_status.set('miss')
+        self.cache.set(endpoint, key, result)
+        return result
+
+    def _refresh_in_background(self, endpoint, key, fetch):
+        """Refetch a stale entry on the refresh pool, at most once at a time per key"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._refresh_pool.submit(self._refresh, endpoint, key, fetch)
+
+    def _refresh(self, endpoint, key, fetch):
+        try:
+            self.cache.set(endpoint, key, fetch())
+        except EbayApiError as e:
+            logger.info(f'Background refresh of {key} failed: {e.message}')
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    def warm(self, endpoint, cache_params, marketplace, raw=False, within=0):
+        """
+        Refetch a cached search or item unless it stays fresh for `within` more seconds.
+        Used by the cache warmer; returns True when eBay was called.
+        """
+        if self.cache is None:
+            return False
+        key = self._cache_key(endpoint, cache_params, marketplace, raw)
+        remaining = self.cache.expires_in(endpoint, key)
+        if remaining is not None and remaining > within:
+            return False
+
+        if endpoint == 'search':
+            url, params, error_message = Config.EBAY_SEARCH_URL, cache_params, 'Error searching eBay products'
+        else:
+            url, params, error_message = f"{Config.EBAY_ITEM_URL}{cache_params['id']}", None, 'Error getting eBay item details'
+        get = self._get_raw if raw else self._get
+        self.cache.set(endpoint, key, get(endpoint, url, error_message, params, marketplace))
+        return True
+
+    def search_products(self, q, limit, offset=0, marketplace=None):
+        params = {
+            'q': q,
+            'limit': limit
+        }
+        if offset:
+            params['offset'] = offset
+        return self._cached_get('search', params, Config.EBAY_SEARCH_URL,
+                                'Error searching eBay products', params=params, marketplace=marketplace)
+
+    def search_products_raw(self, q, limit, marketplace=None):
+        params = {
+            'q': q,
+            'limit': limit
+        }
+        return self._cached_get_raw('search', params, Config.EBAY_SEARCH_URL,
+                                    'Error searching eBay products', params=params, marketplace=marketplace)
+
+    def iter_search_pages(self, q, max_results, page_size=None, marketplace=None):
+        """
+        Yield lists of item summaries page by page, up to max_results items.
+        The next page is requested as soon as the current one arrives, so it
+        downloads while the caller is still sending the current page.
+        """
+        page_size = min(page_size or Config.SEARCH_STREAM_PAGE_SIZE, max_results)
+        offset = 0
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self.search_products, q, page_size, offset, marketplace)
+            while future is not None:
+                page = future.result()
+                summaries = page.get('itemSummaries', [])[:max_results - offset]
+                offset += len(summaries)
+
+                future = None
+                remaining = min(max_results, Config.SEARCH_MAX_OFFSET) - offset
+                if page.get('next') and summaries and remaining > 0:
+                    future = pool.submit(self.search_products, q, min(page_size, remaining), offset, marketplace)
+
+                yield summaries
+
+    def iter_search_pages_concurrently(self, q, max_results, marketplace=None):
+        """
+        Yield lists of item summaries for up to max_results items, in completion order.
+        The first page tells how many results there are; the remaining pages
+        are then requested together, BATCH_MAX_CONCURRENCY at a time.
+        """
+        page_size = min(Config.SEARCH_STREAM_PAGE_SIZE, max_results)
+        first_page = self.search_products(q, page_size, 0, marketplace)
+        yield first_page.get('itemSummaries', [])
+
+        end = min(max_results, first_page.get('total', 0), Config.SEARCH_MAX_OFFSET)
+        offsets = range(page_size, end, page_size)
+        if not offsets:
+            return
+        with ThreadPoolExecutor(max_workers=Config.BATCH_MAX_CONCURRENCY) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.search_products, q,
+                            min(page_size, end - offset), offset, marketplace)
+                for offset in offsets
+            ]
+            try:
+                for future in as_completed(futures):
+                    yield future.result().get('itemSummaries', [])
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def get_item_details(self, item_id, marketplace=None):
+        return self._cached_get('item', {'id': item_id}, f'{Config.EBAY_ITEM_URL}{item_id}',
+                                'Error getting eBay item details', marketplace=marketplace)
+
+    def get_item_details_raw(self, item_id, marketplace=None):
+        return self._cached_get_raw('item', {'id': item_id}, f'{Config.EBAY_ITEM_URL}{item_id}',
+                                    'Error getting eBay item details', marketplace=marketplace)
+
+    def get_items(self, item_ids, marketplace=None):
+        """
+        Look up several items in one call.
+        IDs are deduplicated and cached items are served directly. The rest are
+        fetched concurrently: RESTful IDs (v1|...|...) through eBay's get_items
+        group call in batches, any other ID through a single item lookup.
+        Returns (items, errors), both keyed by item ID.
+        """
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        items = {}
+        errors = {}
+        grouped = []
+        single = []
+
+        for item_id in dict.fromkeys(item_ids):
+            cached = self._cache_lookup('item', {'id': item_id}, marketplace)
+            if cached is not None:
+                items[item_id] = cached
+            elif item_id.startswith('v1|'):
+                grouped.append(item_id)
+            else:
+                single.append(item_id)
+
+        batch_size = Config.EBAY_GET_ITEMS_MAX_IDS
+        groups = [grouped[i:i + batch_size] for i in range(0, len(grouped), batch_size)]
+        if not groups and not single:
+            return items, errors
+
+        with ThreadPoolExecutor(max_workers=Config.BATCH_MAX_CONCURRENCY) as pool:
+            # Each call runs in a copy of the request's context so the access log counts its upstream time
+            group_futures = [(group, pool.submit(contextvars.copy_context().run, self._get_item_group, group, marketplace))
+                             for group in groups]
+            single_futures = [(item_id, pool.submit(contextvars.copy_context().run, self.get_item_details, item_id,
+                                                    marketplace))
+                              for item_id in single]
+
+            for group, future in group_futures:
+                try:
+                    found = future.result()
+                except EbayApiError as e:
+                    for item_id in group:
+                        errors[item_id] = _error_entry(e)
+                    continue
+                for item_id in group:
+                    if item_id in found:
+                        items[item_id] = found[item_id]
+                    else:
+                        errors[item_id] = {'error': 'Item not found', 'status': 404}
+
+            for item_id, future in single_futures:
+                try:
+                    items[item_id] = future.result()
+                except EbayApiError as e:
+                    errors[item_id] = _error_entry(e)
+
+        return items, errors
+
+    def _get_item_group(self, item_ids, marketplace):
+        """Fetch up to EBAY_GET_ITEMS_MAX_IDS items with one get_items call and cache each one"""
+        params = {
+            'item_ids': ','.join(item_ids)
+        }
+        data = self._get('item_group', Config.EBAY_ITEM_URL, 'Error getting eBay item details',
+                         params=params, marketplace=marketplace)
+
+        found = {}
+        for item in data.get('items', []):
+            found[item.get('itemId')] = item
+            self._cache_store('item', {'id': item.get('itemId')}, marketplace, item)
+        return found
+
+    def _cache_key(self, endpoint, cache_params, marketplace, raw):
+        key = make_cache_key(endpoint, marketplace, cache_params)
+        return 'raw|' + key if raw else key
+
+    def _cache_lookup(self, endpoint, cache_params, marketplace, raw=False):
+        if self.cache is None:
+            return None
+        return self.cache.get(endpoint, self._cache_key(endpoint, cache_params, marketplace, raw))
+
+    def _cache_store(self, endpoint, cache_params, marketplace, value, raw=False):
+        if self.cache is not None:
+            self.cache.set(endpoint, self._cache_key(endpoint, cache_params, marketplace, raw), value)
+
+    def suggest_category(self, q, marketplace=None):
+        marketplace = marketplace or Config.EBAY_MARKETPLACE_ID
+        # The local index holds the default marketplace's tree only
+        if self.category_index is not None and marketplace == Config.EBAY_MARKETPLACE_ID:
+            suggestions = self.category_index.suggest(q)
+            if suggestions is not None:
+                return suggestions
+
+        params = {
+            'q': q
+        }
+        url = Config.EBAY_CATEGORY_URL.format(tree_id=Config.EBAY_CATEGORY_TREE_IDS[marketplace])
+        return self._cached_get('category', params, url,
+                                'Error suggesting eBay category', params=params, marketplace=marketplace)
+
+    def get_category_tree(self):
+        """Download the default marketplace's full category tree, used to build the local category index"""
+        url = Config.EBAY_CATEGORY_TREE_URL.format(tree_id=Config.EBAY_CATEGORY_TREE_IDS[Config.EBAY_MARKETPLACE_ID])
+        return self._get('category_tree', url, 'Error downloading eBay category tree')
+
+
+def _error_entry(error):
+    """Per-item error body used in batch responses"""
+    entry = {'error': error.message, 'status': error.status_code}
+    if error.details:
+        entry['details'] = error.details
+    return entry
+
+
+def to_api_error(error, message):
+    """Convert an upstream HTTP exception into an EbayApiError carrying eBay's error body"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return EbayApiError(message, 500, str(error))
+
+    try:
+        details = response.json()
+    except ValueError:
+        details = str(error)
+    return EbayApiError(message, response.status_code, details)
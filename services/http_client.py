@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+
+
+# Upstream body kept as received (possibly still gzip-encoded), for pass-through responses
+RawPayload = namedtuple('RawPayload', ['body', 'content_type', 'content_encoding'])
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for all upstream calls.
+    Keeps one keep-alive session per host so repeated eBay calls reuse
+    pooled TCP+TLS connections instead of opening a new one per request.
+    Callers can pass pool= to get a separate session for the same host, so
+    that, for example, each marketplace has its own connections.
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, max_retries=None,
+                 backoff_factor=None, connect_timeout=None, read_timeout=None):
+        self.pool_connections = pool_connections or Config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = Config.HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+        self.timeout = (
+            connect_timeout or Config.HTTP_CONNECT_TIMEOUT,
+            read_timeout or Config.HTTP_READ_TIMEOUT
+        )
+        self._sessions = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        # Only connection errors are retried; a request that reached eBay is never replayed
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=0,
+            backoff_factor=self.backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session_for(self, url, pool=None):
+        """Return the pooled session for the host of the given URL"""
+        if self._pid != os.getpid():
+            # Forked from a preloaded master: its pooled sockets must not be shared
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._sessions = {}
+                    self._pid = os.getpid()
+        key = (urlsplit(url).netloc, pool)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[key] = session
+        return session
+
+    def request(self, method, url, pool=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session_for(url, pool).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_upstream_client():
+    """Return the process-wide upstream client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient()
+    return _client
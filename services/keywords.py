@@ -0,0 +1,116 @@
+"""
+Keyword ranking for listing analysis.
+
+Scores terms by frequency, with title terms weighted by
+KEYWORD_TITLE_WEIGHT, after removing stopwords. When KEYWORD_IDF_PATH
+points to an IDF table, scores are also multiplied by each term's IDF so
+words common to every listing rank lower. Build the table from a corpus
+of listing titles, one per line:
+
+    python -m services.keywords titles.txt idf.json
+"""
+import heapq
+import json
+import logging
+import math
+import re
+import sys
+import threading
+from collections import Counter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\b[a-z][a-z0-9]{2,}\b')
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren as at be because been before
+being below between both but by can cannot could did didn do does doesn doing don down during each
+few for from further get got had has hasn have haven having he her here hers herself him himself his
+how if in into is isn it its itself just let me more most must my myself no nor not now of off on
+once only or other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up upon very via
+was wasn we were weren what when where which while who whom why will with won would you your yours
+yourself yourselves
+item items listing listings seller sellers buyer buyers ebay please thank thanks new used condition
+shipping ship ships shipped free fast description details see photos photo pictures picture read
+""".split())
+
+_idf = None
+_idf_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Lower-case word tokens of at least three characters, stopwords removed"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def load_idf():
+    """Load the IDF table once per process; returns (weights, default weight) or None"""
+    global _idf
+    if _idf is None and Config.KEYWORD_IDF_PATH:
+        with _idf_lock:
+            if _idf is None:
+                try:
+                    with open(Config.KEYWORD_IDF_PATH) as f:
+                        data = json.load(f)
+                    _idf = (data['idf'], data['default'])
+                    logger.info(f"Loaded IDF weights for {len(data['idf'])} terms")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f'Failed to load IDF weights: {str(e)}')
+                    _idf = False
+    return _idf or None
+
+
+def rank_keywords(title, description, limit=20):
+    """
+    Rank the keywords of a listing.
+    Returns [(keyword, score), ...] best first, scores normalized so the top
+    keyword scores 1.0. Runs in linear time over the text.
+    """
+    counts = Counter()
+    for token in tokenize(title):
+        counts[token] += Config.KEYWORD_TITLE_WEIGHT
+    counts.update(tokenize(description))
+    if not counts:
+        return []
+
+    idf = load_idf()
+    if idf:
+        weights, default = idf
+        scores = {term: count * weights.get(term, default) for term, count in counts.items()}
+    else:
+        scores = counts
+
+    # Ties are broken alphabetically so results are stable
+    top = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+    best = top[0][1]
+    return [(term, round(score / best, 4)) for term, score in top]
+
+
+def build_idf(titles):
+    """Compute smoothed IDF weights from an iterable of listing titles"""
+    document_frequency = Counter()
+    documents = 0
+    for title in titles:
+        documents += 1
+        document_frequency.update(set(tokenize(title)))
+
+    idf = {
+        term: round(math.log((1 + documents) / (1 + df)) + 1, 4)
+        for term, df in document_frequency.items()
+    }
+    # Terms never seen in the corpus are treated as rarer than any seen term
+    default = round(math.log(1 + documents) + 1, 4)
+    return {'documents': documents, 'default': default, 'idf': idf}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python -m services.keywords TITLES_FILE OUTPUT_JSON')
+    with open(sys.argv[1], encoding='utf-8') as f:
+        table = build_idf(line.strip() for line in f if line.strip())
+    with open(sys.argv[2], 'w') as f:
+        json.dump(table, f)
+    print(f"Wrote IDF weights for {len(table['idf'])} terms from {table['documents']} titles")
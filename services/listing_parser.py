@@ -0,0 +1,213 @@
+import re
+import time
+from html.parser import HTMLParser
+
+from config import Config
+from services.keywords import rank_keywords
+
+# Listing pages on the eBay sites of the supported marketplaces
+LISTING_URL_RE = re.compile(r'^https?://(www\.)?ebay\.(com|ca|co\.uk|com\.au|at|fr|de|it|nl|es|ch|ie|pl)/itm/')
+
+DESCRIPTION_IDS = ('desc_div', 'viTabs_0_is')
+
+
+class _ScanComplete(Exception):
+    pass
+
+
+class ListingScanner(HTMLParser):
+    """
+    Streaming scan for the listing title and description.
+    Collects the text of the first <h1> and of the description divs the same
+    way BeautifulSoup's get_text(strip=True) would, without building a tree,
+    and stops parsing as soon as the title and the preferred description div
+    are complete. Feed it the whole page or successive chunks.
+    """
+
+    SKIP_TAGS = ('script', 'style', 'template')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.complete = False
+        self._captures = []
+        self._pending = []
+        self._skip_depth = 0
+
+    def feed(self, data):
+        """Feed more HTML; returns True once everything needed has been found"""
+        if not self.complete:
+            try:
+                super().feed(data)
+            except _ScanComplete:
+                self.complete = True
+        return self.complete
+
+    def close(self):
+        if not self.complete:
+            try:
+                super().close()
+            except _ScanComplete:
+                self.complete = True
+        # Unclosed elements keep whatever text was collected, like the tree builder
+        self._flush()
+        for capture in self._captures:
+            self.fields.setdefault(capture['key'], ''.join(capture['parts']))
+        self._captures = []
+
+    def result(self):
+        """Return (title, description), either of which may be None"""
+        description = None
+        for div_id in DESCRIPTION_IDS:
+            if div_id in self.fields:
+                description = self.fields[div_id]
+                break
+        return self.fields.get('title'), description
+
+    def _flush(self):
+        # Each text node is stripped on its own and the pieces joined without a separator
+        if self._pending:
+            text = ''.join(self._pending).strip()
+            self._pending = []
+            if text:
+                for capture in self._captures:
+                    capture['parts'].append(text)
+
+    def _start_capture(self, key, tag):
+        if key not in self.fields and all(capture['key'] != key for capture in self._captures):
+            self._captures.append({'key': key, 'tag': tag, 'depth': 1, 'parts': []})
+            return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        for capture in self._captures:
+            if capture['tag'] == tag:
+                capture['depth'] += 1
+
+        if tag == 'h1':
+            self._start_capture('title', tag)
+        elif tag == 'div':
+            for name, value in attrs:
+                if name == 'id' and value in DESCRIPTION_IDS:
+                    self._start_capture(value, tag)
+                    break
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+        finished = False
+        for capture in list(self._captures):
+            if capture['tag'] == tag:
+                capture['depth'] -= 1
+                if capture['depth'] == 0:
+                    self._captures.remove(capture)
+                    self.fields[capture['key']] = ''.join(capture['parts'])
+                    finished = True
+
+        if finished and 'title' in self.fields and DESCRIPTION_IDS[0] in self.fields:
+            raise _ScanComplete()
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        if self._captures and not self._skip_depth:
+            self._pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+
+def extract_with_scanner(html):
+    """Fast engine: streaming scan that stops once title and description are found"""
+    scanner = ListingScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.result()
+
+
+def extract_with_soup(html):
+    """Reference engine: full BeautifulSoup tree"""
+    # Imported on first use: bs4 is slow to import and the fast engine rarely needs it
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("h1")
+    desc_div = soup.find("div", id="desc_div") or soup.find("div", id="viTabs_0_is")
+    return (
+        title.get_text(strip=True) if title else None,
+        desc_div.get_text(strip=True) if desc_div else None
+    )
+
+
+class ListingExtractor:
+    """
+    Incremental title/description extraction with the configured engine.
+    Feed page text chunk by chunk; feed() returns True once the fast engine
+    has everything it needs so the caller can stop downloading.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._scanner = ListingScanner() if Config.LISTING_PARSER == 'fast' else None
+        self.parse_seconds = 0.0
+
+    def feed(self, text):
+        self._parts.append(text)
+        if self._scanner is None:
+            return False
+        start = time.perf_counter()
+        try:
+            return self._scanner.feed(text)
+        except Exception:
+            # Markup the scanner cannot handle goes through the full tree builder
+            self._scanner = None
+            return False
+        finally:
+            self.parse_seconds += time.perf_counter() - start
+
+    def result(self):
+        """Return (title, description) from the text fed so far"""
+        start = time.perf_counter()
+        try:
+            if self._scanner is not None:
+                try:
+                    self._scanner.close()
+                    return self._scanner.result()
+                except Exception:
+                    pass
+            return extract_with_soup(''.join(self._parts))
+        finally:
+            self.parse_seconds += time.perf_counter() - start
+
+
+def extract_listing_fields(html):
+    """Return (title, description) from listing HTML with the configured engine"""
+    extractor = ListingExtractor()
+    extractor.feed(html)
+    return extractor.result()
+
+
+def build_listing_result(title, description):
+    """Build the /analyze-listing response from the extracted title and description"""
+    raw_title = title or "No title found"
+    raw_description = description or "No description available"
+
+    ranked = rank_keywords(title or '', description or '', limit=Config.KEYWORD_LIMIT)
+
+    return {
+        "title": raw_title,
+        "keywords": [keyword for keyword, _ in ranked],
+        "keyword_scores": [{"keyword": keyword, "score": score} for keyword, score in ranked],
+        "description_snippet": raw_description[:250]
+    }
+
+
+def analyze_listing_html(html):
+    """Extract title, keywords and a description snippet from listing page HTML"""
+    return build_listing_result(*extract_listing_fields(html))
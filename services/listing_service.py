@@ -0,0 +1,222 @@
+import asyncio
+import codecs
+import contextlib
+import logging
+import re
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+import urllib3
+
+from config import Config
+from services.cache import ResponseCache, create_persistent_cache
+from services.http_client import get_upstream_client
+from services.listing_parser import ListingExtractor, build_listing_result
+from utils.error_handlers import EbayApiError, ValidationError
+from utils.metrics import STAGE_LATENCY, observe_upstream
+
+logger = logging.getLogger(__name__)
+
+_ITEM_ID_RE = re.compile(r'/itm/(?:[^/?#]+/)?(\d+)')
+
+
+def listing_cache_key(url):
+    """
+    Key a listing by its eBay site and item ID, falling back to the URL without query string.
+    Each site serves its own price, currency and language, and its own validators.
+    """
+    match = _ITEM_ID_RE.search(url)
+    if match:
+        host = (urlsplit(url).hostname or '').removeprefix('www.')
+        return f'listing|{host}|{match.group(1)}'
+    return 'listing|' + url.split('?', 1)[0].split('#', 1)[0].lower()
+
+
+def download_error(error):
+    """Convert a failed listing download (requests, urllib3 or httpx exception) into an EbayApiError"""
+    if isinstance(error, (requests.Timeout, urllib3.exceptions.TimeoutError, httpx.TimeoutException)):
+        return EbayApiError('Listing page download timed out', 504, str(error))
+    return EbayApiError('Listing page download failed', 502, str(error))
+
+
+def iter_received(response):
+    """
+    Yield the body of a streamed requests response as it arrives, up to
+    LISTING_CHUNK_SIZE bytes at a time. Unlike iter_content, a read returns
+    whatever has been received, so a server trickling bytes cannot hold a
+    read open past the download deadline.
+    """
+    while True:
+        chunk = response.raw.read1(Config.LISTING_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+class PageDecoder:
+    """
+    Decodes a streamed page while enforcing the download limits.
+    Sets `exhausted` once LISTING_MAX_BYTES have been received; the caller
+    stops reading then and works with the text received so far. Raises a
+    504 EbayApiError once LISTING_DOWNLOAD_TIMEOUT has elapsed.
+    """
+
+    def __init__(self, encoding):
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._deadline = time.monotonic() + Config.LISTING_DOWNLOAD_TIMEOUT
+        self.received = 0
+        self.exhausted = False
+
+    def decode(self, chunk):
+        if time.monotonic() > self._deadline:
+            raise EbayApiError('Listing page download timed out', 504,
+                               f'No complete page after {Config.LISTING_DOWNLOAD_TIMEOUT}s')
+        remaining = Config.LISTING_MAX_BYTES - self.received
+        if len(chunk) >= remaining:
+            chunk = chunk[:remaining]
+            self.exhausted = True
+            logger.warning(f'Listing page truncated at {Config.LISTING_MAX_BYTES} bytes')
+        self.received += len(chunk)
+        return self._decoder.decode(chunk, final=self.exhausted)
+
+    def finish(self):
+        return self._decoder.decode(b'', final=True)
+
+
+class ListingService:
+    """
+    Fetches and analyzes eBay listing pages.
+    Results are cached per item together with the page's ETag/Last-Modified.
+    Within LISTING_REVALIDATE_AFTER a cached result is served without any
+    request; after that the page is revalidated with a conditional GET, so an
+    unchanged page costs a 304 instead of a full download and parse.
+    Pages are streamed under a byte cap and deadline, and the download stops
+    as soon as the title and description have been found.
+    """
+
+    def __init__(self, client=None, cache=None):
+        self.client = client or get_upstream_client()
+        self.cache = cache if cache is not None else ResponseCache(
+            max_entries=Config.LISTING_CACHE_MAX_ENTRIES,
+            ttls={'listing': Config.LISTING_CACHE_TTL},
+            shared=create_persistent_cache(),
+            stale_ttl=0
+        )
+        self.revalidated = 0
+
+    def cached_entry(self, key):
+        return self.cache.get('listing', key)
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['checked_at'] < Config.LISTING_REVALIDATE_AFTER
+
+    def request_headers(self, entry):
+        """Headers for the page request, conditional when we hold validators"""
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def check_status(self, key, entry, status_code):
+        """Return the cached result for a 304, raise for unavailable pages, else None"""
+        if status_code == 304 and entry is not None:
+            self.revalidated += 1
+            self.cache.set('listing', key, dict(entry, checked_at=time.time()))
+            return entry['result']
+        if status_code != 200:
+            raise ValidationError("Listing URL not available or removed")
+        return None
+
+    def store(self, key, headers, result):
+        self.cache.set('listing', key, {
+            'result': result,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'checked_at': time.time()
+        })
+
+    def analyze(self, url):
+        """Return title, keywords and description snippet for a listing URL"""
+        key = listing_cache_key(url)
+        entry = self.cached_entry(key)
+        if self.is_fresh(entry):
+            return entry['result']
+        try:
+            return self._download(url, key, entry)
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            raise download_error(e)
+
+    def _download(self, url, key, entry):
+        timeout = (Config.LISTING_CONNECT_TIMEOUT, Config.LISTING_READ_TIMEOUT)
+        with observe_upstream('listing_page') as call:
+            response = self.client.get(url, headers=self.request_headers(entry), stream=True, timeout=timeout)
+            call['status'] = response.status_code
+        with contextlib.closing(response):
+            cached = self.check_status(key, entry, response.status_code)
+            if cached is not None:
+                return cached
+
+            extractor = ListingExtractor()
+            decoder = PageDecoder(response.encoding)
+            for chunk in iter_received(response):
+                if extractor.feed(decoder.decode(chunk)) or decoder.exhausted:
+                    break
+            else:
+                extractor.feed(decoder.finish())
+
+        result = build_listing_result(*extractor.result())
+        STAGE_LATENCY.observe(extractor.parse_seconds, stage='parse')
+        self.store(key, response.headers, result)
+        return result
+
+    async def analyze_async(self, url, client):
+        """Same as analyze, streaming with an async httpx client; parsing and cache I/O run off the event loop"""
+        key = listing_cache_key(url)
+        entry = await asyncio.to_thread(self.cached_entry, key)
+        if self.is_fresh(entry):
+            return entry['result']
+        try:
+            # The whole download is cancelled at the deadline, even while a read is waiting
+            return await asyncio.wait_for(self._download_async(url, client, key, entry),
+                                          Config.LISTING_DOWNLOAD_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise EbayApiError('Listing page download timed out', 504,
+                               f'No complete page after {Config.LISTING_DOWNLOAD_TIMEOUT}s')
+        except httpx.HTTPError as e:
+            raise download_error(e)
+
+    async def _download_async(self, url, client, key, entry):
+        # httpx takes (connect, read, write, pool)
+        timeout = (Config.LISTING_CONNECT_TIMEOUT, Config.LISTING_READ_TIMEOUT,
+                   Config.LISTING_READ_TIMEOUT, Config.LISTING_CONNECT_TIMEOUT)
+        async with contextlib.AsyncExitStack() as stack:
+            with observe_upstream('listing_page') as call:
+                response = await stack.enter_async_context(
+                    client.stream('GET', url, headers=self.request_headers(entry), timeout=timeout)
+                )
+                call['status'] = response.status_code
+
+            cached = await asyncio.to_thread(self.check_status, key, entry, response.status_code)
+            if cached is not None:
+                return cached
+
+            extractor = ListingExtractor()
+            decoder = PageDecoder(response.encoding)
+            async for chunk in response.aiter_bytes():
+                if await asyncio.to_thread(extractor.feed, decoder.decode(chunk)) or decoder.exhausted:
+                    break
+            else:
+                await asyncio.to_thread(extractor.feed, decoder.finish())
+
+        result = await asyncio.to_thread(lambda: build_listing_result(*extractor.result()))
+        STAGE_LATENCY.observe(extractor.parse_seconds, stage='parse')
+        await asyncio.to_thread(self.store, key, response.headers, result)
+        return result
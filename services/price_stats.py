@@ -0,0 +1,102 @@
+"""
+Price statistics over search results.
+
+Item summaries are reduced to columns as pages arrive: prices, shipping
+costs and totals go into array('d') buffers and conditions and sellers into
+counters, so the item dicts can be dropped right away. Only items priced in
+the most common currency are aggregated; the others are counted as skipped.
+"""
+import math
+from array import array
+from collections import Counter
+
+PERCENTILES = (10, 25, 75, 90)
+TOP_SELLERS = 10
+
+
+def _to_float(amount):
+    try:
+        value = float((amount or {}).get('value'))
+    except (TypeError, ValueError):
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def shipping_cost(summary):
+    """Cheapest listed shipping cost of an item summary, or NaN when eBay gives none"""
+    costs = [_to_float(option.get('shippingCost')) for option in summary.get('shippingOptions') or ()]
+    costs = [cost for cost in costs if not math.isnan(cost)]
+    return min(costs) if costs else math.nan
+
+
+def percentile(sorted_values, fraction):
+    """Linearly interpolated percentile of an ascending sequence"""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values):
+    """count/min/max/mean/median/percentiles of an array('d'), ignoring NaN entries"""
+    values = array('d', sorted(value for value in values if not math.isnan(value)))
+    if not values:
+        return {'count': 0}
+    summary = {
+        'count': len(values),
+        'min': values[0],
+        'max': values[-1],
+        'mean': round(math.fsum(values) / len(values), 2),
+        'median': round(percentile(values, 0.5), 2)
+    }
+    for p in PERCENTILES:
+        summary[f'p{p}'] = round(percentile(values, p / 100), 2)
+    return summary
+
+
+class PriceStats:
+    """Accumulates search result pages into columns and summarizes them"""
+
+    def __init__(self):
+        self.currencies = []  # per item, aligned with the columns
+        self.prices = array('d')
+        self.shipping = array('d')
+        self.conditions = Counter()
+        self.sellers = Counter()
+        self.items = 0
+
+    def add(self, summaries):
+        for summary in summaries:
+            price = _to_float(summary.get('price'))
+            if math.isnan(price):
+                continue
+            self.items += 1
+            self.currencies.append((summary.get('price') or {}).get('currency'))
+            self.prices.append(price)
+            self.shipping.append(shipping_cost(summary))
+            self.conditions[summary.get('condition') or 'Unknown'] += 1
+            seller = (summary.get('seller') or {}).get('username')
+            if seller:
+                self.sellers[seller] += 1
+
+    def result(self):
+        currency = Counter(self.currencies).most_common(1)[0][0] if self.currencies else None
+        selected = [index for index, item_currency in enumerate(self.currencies) if item_currency == currency]
+        prices = array('d', (self.prices[index] for index in selected))
+        shipping = array('d', (self.shipping[index] for index in selected))
+        # NaN shipping propagates, so items without a shipping cost drop out of the totals
+        totals = array('d', (price + cost for price, cost in zip(prices, shipping)))
+
+        return {
+            'items': self.items,
+            'currency': currency,
+            'skipped_other_currency': self.items - len(selected),
+            'price': summarize(prices),
+            'shipping': summarize(shipping),
+            'total_price': summarize(totals),
+            'conditions': dict(self.conditions.most_common()),
+            'sellers': {
+                'count': len(self.sellers),
+                'top': [{'username': name, 'items': count} for name, count in self.sellers.most_common(TOP_SELLERS)]
+            }
+        }
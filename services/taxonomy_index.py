@@ -0,0 +1,217 @@
+"""
+Local index over the eBay category tree for /category.
+
+The tree for the marketplace is downloaded once, kept for
+CATEGORY_INDEX_REFRESH seconds and then downloaded again in the
+background. Category names and their ancestor paths are tokenized into an
+inverted index; query words also match as prefixes of indexed words
+through a sorted vocabulary. A match's confidence is the IDF-weighted
+share of query words found in the category name or path, divided by the
+number of categories that tie for the best score, so a query that fits
+several categories equally well is not answered with an arbitrary pick.
+Only matches reaching CATEGORY_INDEX_MIN_CONFIDENCE are answered locally;
+anything less goes to the live get_category_suggestions API.
+"""
+import bisect
+import logging
+import math
+import os
+import re
+import time
+
+from config import Config
+from utils.error_handlers import EbayApiError
+from utils.metrics import CATEGORY_INDEX_LOOKUPS
+from utils.shared_file import WorkerThread, locked_file, read_json, write_json
+
+
+logger = logging.getLogger(__name__)
+
+# Single digits are kept ("iphone 5", "size 8"); single letters are mostly the "s" of possessives
+_TOKEN_RE = re.compile(r'[a-z0-9]{2,}|[0-9]')
+
+NAME_WEIGHT = 1.0  # word found in the category's own name
+PATH_WEIGHT = 0.5  # word found only in an ancestor's name
+MIN_PREFIX_LENGTH = 3  # shorter query words must match a whole word
+MAX_PREFIX_EXPANSIONS = 20
+TIE_MARGIN = 0.1  # categories scoring within this share of the best score tie with it
+
+
+def normalize_terms(text):
+    """Lower-case words of a name or query, with a plain trailing 's' removed"""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class CategoryIndex:
+    """Immutable search structure built from one version of the category tree"""
+
+    def __init__(self, tree):
+        self.tree_id = tree.get('categoryTreeId')
+        self.tree_version = tree.get('categoryTreeVersion')
+        self.categories = []  # (id, name, level, ancestors, leaf)
+        self.postings = {}  # term -> {category index: weight}
+
+        stack = [(tree['rootCategoryNode'], ())]
+        while stack:
+            node, ancestors = stack.pop()
+            category = node.get('category', {})
+            level = node.get('categoryTreeNodeLevel', 0)
+            children = node.get('childCategoryTreeNodes', [])
+            # The root (level 0) is not a category sellers can list in
+            if level > 0:
+                self._add(category, level, ancestors, not children)
+                ancestors = ancestors + ((category.get('categoryId'), category.get('categoryName', ''), level),)
+            for child in children:
+                stack.append((child, ancestors))
+
+        self.vocabulary = sorted(self.postings)
+        count = len(self.categories) or 1
+        self.idf = {term: math.log(1 + count / len(postings)) for term, postings in self.postings.items()}
+
+    def _add(self, category, level, ancestors, leaf):
+        index = len(self.categories)
+        self.categories.append((category.get('categoryId'), category.get('categoryName', ''), level, ancestors, leaf))
+        for _, name, _ in ancestors:
+            for term in normalize_terms(name):
+                self.postings.setdefault(term, {})[index] = PATH_WEIGHT
+        for term in normalize_terms(category.get('categoryName', '')):
+            self.postings.setdefault(term, {})[index] = NAME_WEIGHT
+
+    def _expand(self, term):
+        """Indexed words matching a query word: the word itself, or words it is a prefix of"""
+        if term in self.postings or len(term) < MIN_PREFIX_LENGTH:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.vocabulary, term)
+        matches = []
+        for word in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not word.startswith(term):
+                break
+            matches.append(word)
+        return matches
+
+    def search(self, q, limit):
+        """Return [(confidence, category index)] for the best matching categories"""
+        terms = list(dict.fromkeys(normalize_terms(q)))
+        if not terms:
+            return []
+
+        scores = {}
+        total = 0.0
+        for term in terms:
+            words = self._expand(term)
+            # Unknown words still count in the total, lowering confidence
+            weight = max((self.idf[word] for word in words), default=math.log(1 + len(self.categories)))
+            total += weight
+            best = {}
+            for word in words:
+                for index, match in self.postings[word].items():
+                    if match > best.get(index, 0):
+                        best[index] = match
+            for index, match in best.items():
+                scores[index] = scores.get(index, 0.0) + weight * match
+
+        def rank(index):
+            _, name, level, _, leaf = self.categories[index]
+            return (-scores[index], not leaf, -level, len(name))
+
+        ranked = sorted(scores, key=rank)
+        best = scores[ranked[0]]
+        ties = sum(1 for score in scores.values() if score >= best * (1 - TIE_MARGIN))
+        return [(scores[index] / total / ties, index) for index in ranked[:limit]]
+
+    def suggestion(self, index):
+        """Format a category like an entry of get_category_suggestions' categorySuggestions"""
+        category_id, name, level, ancestors, _ = self.categories[index]
+        return {
+            'category': {'categoryId': category_id, 'categoryName': name},
+            'categoryTreeNodeAncestors': [
+                {'categoryId': ancestor_id, 'categoryName': ancestor_name, 'categoryTreeNodeLevel': ancestor_level}
+                for ancestor_id, ancestor_name, ancestor_level in reversed(ancestors)
+            ],
+            'categoryTreeNodeLevel': level
+        }
+
+
+class TaxonomyIndex:
+    """
+    Keeps a CategoryIndex for the marketplace up to date.
+    The tree is loaded by a background thread, so until the first download
+    completes every query falls back to the live API. With CATEGORY_TREE_FILE
+    set, the downloaded tree is saved there and reused by other workers and
+    restarts while it is younger than CATEGORY_INDEX_REFRESH.
+    """
+
+    def __init__(self, fetch_tree, tree_file=None):
+        self.fetch_tree = fetch_tree
+        self.tree_file = tree_file if tree_file is not None else Config.CATEGORY_TREE_FILE
+        self.index = None
+        self.loaded_at = 0
+        self._loader = WorkerThread(self._load_loop, 'ebay-category-index')
+
+    def suggest(self, q, limit=None):
+        """Return a get_category_suggestions style body, or None when the API should answer"""
+        self._loader.ensure_started()
+        index = self.index
+        if index is None:
+            CATEGORY_INDEX_LOOKUPS.inc(result='not_loaded')
+            return None
+
+        matches = index.search(q, limit or Config.CATEGORY_INDEX_MAX_SUGGESTIONS)
+        if not matches or matches[0][0] < Config.CATEGORY_INDEX_MIN_CONFIDENCE:
+            CATEGORY_INDEX_LOOKUPS.inc(result='fallback')
+            return None
+
+        CATEGORY_INDEX_LOOKUPS.inc(result='local')
+        return {
+            'categorySuggestions': [
+                index.suggestion(match) for confidence, match in matches
+                if confidence >= Config.CATEGORY_INDEX_MIN_CONFIDENCE
+            ],
+            'categoryTreeId': index.tree_id,
+            'categoryTreeVersion': index.tree_version
+        }
+
+    def load(self):
+        """Download (or read from the tree file) the category tree and swap in a new index"""
+        tree = self._load_tree()
+        index = CategoryIndex(tree)
+        self.index = index
+        self.loaded_at = time.time()
+        logger.info(f'Category index built: {len(index.categories)} categories, '
+                    f'tree version {index.tree_version}')
+
+    def _load_tree(self):
+        if not self.tree_file:
+            return self.fetch_tree()
+
+        with locked_file(self.tree_file) as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime < Config.CATEGORY_INDEX_REFRESH:
+                try:
+                    return read_json(f)
+                except ValueError:
+                    pass  # empty or partial file; download below
+            tree = self.fetch_tree()
+            write_json(f, tree)
+            return tree
+
+    def _load_loop(self):
+        while True:
+            try:
+                self.load()
+                delay = Config.CATEGORY_INDEX_REFRESH
+            except (EbayApiError, OSError, KeyError, ValueError) as e:
+                logger.warning(f'Category index load failed: {str(e)}')
+                delay = Config.CATEGORY_INDEX_RETRY_DELAY
+            time.sleep(delay)
+
+
+def create_taxonomy_index(fetch_tree):
+    """Build the local category index from Config, or return None when it is disabled"""
+    if not Config.CATEGORY_INDEX_ENABLED:
+        return None
+    return TaxonomyIndex(fetch_tree)
@@ -0,0 +1,167 @@
+import base64
+import logging
+import threading
+import time
+
+import requests
+
+from config import Config
+from services.circuit_breaker import get_breaker
+from utils.error_handlers import EbayApiError
+from utils.metrics import STAGE_LATENCY, TOKEN_REFRESHES, observe_upstream
+from utils.shared_file import WorkerThread, locked_file, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Holds the eBay application OAuth token.
+    Refreshes are single-flight: one thread calls the OAuth endpoint while the
+    others wait for its result. A background thread renews the token once it
+    enters the TOKEN_EXPIRY_BUFFER window, so requests normally never block on
+    OAuth. With TOKEN_SHARE_FILE set, workers share the token through that file.
+    """
+
+    def __init__(self, client, scope=None, share_file=None):
+        self.client = client
+        self.scope = scope or Config.EBAY_OAUTH_SCOPE
+        self.share_file = share_file if share_file is not None else Config.TOKEN_SHARE_FILE
+        self.access_token = None
+        self.expires_at = 0
+        self.refresh_count = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher = WorkerThread(self._refresh_loop, 'ebay-token-refresher')
+        self._scoped = {}
+
+    def get_token(self):
+        """Return a valid access token, fetching one only when none is usable"""
+        self._refresher.ensure_started()
+
+        if self._is_usable(self.access_token, self.expires_at):
+            return self.access_token
+
+        # Time spent here is a request blocked on OAuth
+        with STAGE_LATENCY.time(stage='oauth'), self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not self._is_usable(self.access_token, self.expires_at):
+                self._refresh_locked()
+            return self.access_token
+
+    def for_marketplace(self, marketplace):
+        """
+        Return the manager holding the token for a marketplace.
+        That is this manager unless MARKETPLACE_OAUTH_SCOPES gives the
+        marketplace another scope, which then gets a manager of its own.
+        """
+        scope = Config.MARKETPLACE_OAUTH_SCOPES.get(marketplace)
+        if not scope or scope == self.scope:
+            return self
+        manager = self._scoped.get(scope)
+        if manager is None:
+            with self._lock:
+                manager = self._scoped.get(scope)
+                if manager is None:
+                    share_file = f'{self.share_file}.{marketplace}' if self.share_file else ''
+                    manager = self._scoped[scope] = TokenManager(self.client, scope=scope, share_file=share_file)
+        return manager
+
+    def peek(self):
+        """Return the current token if it is usable, without ever blocking on OAuth"""
+        self._refresher.ensure_started()
+        if self._is_usable(self.access_token, self.expires_at):
+            return self.access_token
+        return None
+
+    def refresh(self):
+        """Renew the token now, unless a fresh one was already obtained"""
+        with self._lock:
+            if self.expires_at - time.time() > Config.TOKEN_EXPIRY_BUFFER:
+                return self.access_token
+            self._refresh_locked()
+            return self.access_token
+
+    def _is_usable(self, token, expires_at):
+        return token is not None and expires_at - time.time() > Config.TOKEN_MIN_VALIDITY
+
+    def _refresh_locked(self):
+        if not self.share_file:
+            self._store(*self._fetch())
+            return
+
+        with locked_file(self.share_file) as f:
+            token, expires_at = self._read_shared(f)
+            if token is None or expires_at - time.time() <= Config.TOKEN_EXPIRY_BUFFER:
+                token, expires_at = self._fetch()
+                write_json(f, {'access_token': token, 'expires_at': expires_at})
+            self._store(token, expires_at)
+
+    def _read_shared(self, f):
+        try:
+            data = read_json(f)
+            return data.get('access_token'), float(data.get('expires_at', 0))
+        except ValueError:
+            return None, 0  # empty or partial file; refreshed by the caller
+
+    def _store(self, token, expires_at):
+        self.access_token = token
+        self.expires_at = expires_at
+        self._wakeup.set()
+
+    def _fetch(self):
+        """Request a new application token from the eBay OAuth endpoint"""
+        breaker = get_breaker('oauth')
+        breaker.before_call()
+        try:
+            auth_string = f"{Config.EBAY_APP_ID}:{Config.EBAY_CLIENT_SECRET}"
+            encoded_auth = base64.b64encode(auth_string.encode()).decode()
+
+            headers = {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Authorization': f'Basic {encoded_auth}'
+            }
+
+            data = {
+                'grant_type': 'client_credentials',
+                'scope': self.scope
+            }
+
+            with observe_upstream('oauth') as call:
+                response = self.client.post(Config.EBAY_OAUTH_URL, headers=headers, data=data)
+                call['status'] = response.status_code
+            response.raise_for_status()
+
+            response_data = response.json()
+            self.refresh_count += 1
+            breaker.record_success()
+            TOKEN_REFRESHES.inc(outcome='success')
+            logger.info("Successfully retrieved eBay OAuth token")
+            return response_data['access_token'], time.time() + response_data['expires_in']
+        except Exception as e:
+            # Rejected credentials are not an outage; anything else counts against the breaker
+            response = getattr(e, 'response', None)
+            if isinstance(e, requests.exceptions.HTTPError) and response is not None and response.status_code < 500:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            TOKEN_REFRESHES.inc(outcome='failure')
+            logger.error(f'Error getting eBay token: {str(e)}')
+            raise EbayApiError('Failed to authenticate with eBay API')
+
+    def _refresh_loop(self):
+        while True:
+            if self.access_token is None:
+                delay = None  # nothing to renew until the first token arrives
+            else:
+                delay = max(self.expires_at - Config.TOKEN_EXPIRY_BUFFER - time.time(), 0)
+
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            if self.access_token is None or self.expires_at - time.time() > Config.TOKEN_EXPIRY_BUFFER:
+                continue
+
+            try:
+                self.refresh()
+            except EbayApiError:
+                self._wakeup.wait(Config.TOKEN_REFRESH_RETRY_DELAY)
@@ -0,0 +1,65 @@
+import logging
+import math
+import time
+
+from limits import RateLimitItemPerDay
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from config import Config
+from utils.error_handlers import EbayApiError
+
+logger = logging.getLogger(__name__)
+
+_BUDGET_KEY = 'ebay-upstream'
+
+
+class UpstreamBudget:
+    """
+    Daily budget of eBay API calls.
+    Counters live in the rate-limit storage, so with a shared backend
+    (redis://, memcached://) every worker draws from the same quota; with
+    memory:// each worker process counts its own. When the storage cannot
+    be reached the budget fails open, like the shared response cache: calls
+    are allowed and a warning is logged.
+    """
+
+    def __init__(self, daily_quota=None, storage_uri=None, reserve=None):
+        self.item = RateLimitItemPerDay(daily_quota or Config.EBAY_DAILY_CALL_QUOTA)
+        self.limiter = FixedWindowRateLimiter(storage_from_string(storage_uri or Config.RATELIMIT_STORAGE_URI))
+        self.reserve = Config.EBAY_QUOTA_RESERVE if reserve is None else reserve
+
+    def remaining(self):
+        """Calls left today, or None when the storage cannot be reached"""
+        try:
+            return self.limiter.get_window_stats(self.item, _BUDGET_KEY).remaining
+        except Exception as e:
+            logger.warning(f'Reading the eBay call budget failed: {str(e)}')
+            return None
+
+    def near_exhaustion(self):
+        """True once the remaining calls drop into the reserved share of the quota"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= self.item.amount * self.reserve
+
+    def consume(self):
+        """Count one upstream call, raising a 503 EbayApiError when the budget is spent"""
+        try:
+            allowed = self.limiter.hit(self.item, _BUDGET_KEY)
+            reset_time = None if allowed else self.limiter.get_window_stats(self.item, _BUDGET_KEY).reset_time
+        except Exception as e:
+            logger.warning(f'Counting the eBay call budget failed, allowing the call: {str(e)}')
+            return
+        if not allowed:
+            raise EbayApiError('eBay API call budget exhausted, try again later', 503,
+                               retry_after=max(1, math.ceil(reset_time - time.time())))
+
+
+def create_upstream_budget():
+    """Build the upstream budget from Config, or return None when it is disabled"""
+    if Config.EBAY_DAILY_CALL_QUOTA <= 0:
+        return None
+    if Config.RATELIMIT_STORAGE_URI.startswith('memory://'):
+        logger.warning(f'EBAY_DAILY_CALL_QUOTA ({Config.EBAY_DAILY_CALL_QUOTA}) is counted per worker process '
+                       'with memory:// storage; set RATELIMIT_STORAGE_URI to share it')
+    return UpstreamBudget()
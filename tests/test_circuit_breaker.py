@@ -0,0 +1,120 @@
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from utils.error_handlers import EbayApiError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces time.monotonic for the breaker; advance it by adding to clock['now']"""
+    now = {'now': 1000.0}
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now['now'])
+    return now
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('search', failure_threshold=3, reset_timeout=30)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_stays_closed_below_threshold(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_success_resets_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.is_closed
+
+
+def test_opens_at_threshold_and_fails_fast(breaker, clock):
+    _open(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.is_closed
+
+    clock['now'] += 10
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.status_code == 503
+    assert raised.value.retry_after == 20
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    _open(breaker)
+    clock['now'] += 30
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Other callers keep failing fast while the probe is out
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_probe_success_closes(breaker, clock):
+    _open(breaker)
+    clock['now'] += 30
+    breaker.before_call()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    breaker.before_call()
+
+
+def test_probe_failure_reopens(breaker, clock):
+    _open(breaker)
+    clock['now'] += 30
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+
+
+def test_lost_probe_is_replaced_after_timeout(breaker, clock):
+    _open(breaker)
+    clock['now'] += 30
+    breaker.before_call()
+
+    clock['now'] += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_record_counts_only_server_errors(breaker):
+    for _ in range(5):
+        breaker.record(EbayApiError('Error getting eBay item details', 404))
+    assert breaker.is_closed
+
+    for _ in range(3):
+        breaker.record(EbayApiError('Error getting eBay item details', 502))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.state = CircuitBreaker.HALF_OPEN
+    breaker.record()
+    assert breaker.is_closed
+
+
+def test_endpoints_sharing_an_api_share_a_breaker():
+    assert get_breaker('category') is get_breaker('category_tree')
+    assert get_breaker('item_group') is get_breaker('item')
+    assert get_breaker('search') is not get_breaker('item')
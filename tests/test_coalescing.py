@@ -0,0 +1,199 @@
+import asyncio
+import threading
+
+import pytest
+
+from services import coalescing
+from services.coalescing import AsyncSingleFlight, SingleFlight
+from utils.error_handlers import EbayApiError
+
+
+class _ObservedEvent(threading.Event):
+    """Event that also signals when a waiter starts waiting on it"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = threading.Event()
+
+    def wait(self, timeout=None):
+        self.waiting.set()
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """The in-flight calls SingleFlight creates, with done events a test can observe"""
+    created = []
+
+    class ObservedCall(coalescing._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = _ObservedEvent()
+            created.append(self)
+
+    monkeypatch.setattr(coalescing, '_Call', ObservedCall)
+    return created
+
+
+def _run_leader(flight, key, fn):
+    """Start fn as the leader for key in a thread; returns the thread and its outcome list"""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(flight.do(key, fn))
+        except BaseException as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def _join_as_waiter(flight, key, calls):
+    """Join the leader's call for key from another thread, once the waiter is blocked on it"""
+    thread, outcome = _run_leader(flight, key, lambda: pytest.fail('a waiter must not run the function'))
+    assert calls[0].done.waiting.wait(5)
+    return thread, outcome
+
+
+def test_waiter_shares_leader_result(calls):
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return {'total': 3}
+
+    leader, leader_outcome = _run_leader(flight, 'search', fetch)
+    assert started.wait(5)
+    waiter, waiter_outcome = _join_as_waiter(flight, 'search', calls)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert leader_outcome == [({'total': 3}, False)]
+    assert waiter_outcome == [({'total': 3}, True)]
+    assert runs == [1]
+
+
+def test_leader_error_propagates_to_waiter(calls):
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    error = EbayApiError('Error searching eBay products', 502)
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise error
+
+    leader, leader_outcome = _run_leader(flight, 'search', fetch)
+    assert started.wait(5)
+    waiter, waiter_outcome = _join_as_waiter(flight, 'search', calls)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert leader_outcome == [error]
+    assert waiter_outcome == [error]
+
+
+def test_leader_raises_and_key_is_released():
+    flight = SingleFlight()
+
+    def fetch():
+        raise EbayApiError('Error getting eBay item details', 500)
+
+    with pytest.raises(EbayApiError):
+        flight.do('item', fetch)
+
+    assert flight._calls == {}
+    # The next caller runs the function again instead of reusing the failure
+    assert flight.do('item', lambda: 'fresh') == ('fresh', False)
+
+
+def test_leader_interrupted_releases_key():
+    flight = SingleFlight()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        flight.do('item', interrupted)
+    assert flight._calls == {}
+
+
+def test_calls_are_removed_after_success():
+    flight = SingleFlight()
+
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('a', lambda: 2) == (2, False)
+    assert flight._calls == {}
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+
+
+def test_async_waiters_share_one_call():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def main():
+        return await asyncio.gather(*(flight.do('search', fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert results == [('result', False), ('result', True), ('result', True)]
+    assert runs == [1]
+    assert flight._calls == {}
+
+
+def test_async_error_propagates_and_key_is_released():
+    flight = AsyncSingleFlight()
+    error = EbayApiError('Error searching eBay products', 503)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise error
+
+    async def main():
+        return await asyncio.gather(flight.do('search', fetch), flight.do('search', fetch), return_exceptions=True)
+
+    assert asyncio.run(main()) == [error, error]
+    assert flight._calls == {}
+
+
+def test_async_waiter_timeout_does_not_cancel_the_call():
+    flight = AsyncSingleFlight()
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return 'result'
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(flight.do('search', fetch))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do('search', fetch), 0.01)
+        release.set()
+        return await leader
+
+    assert asyncio.run(main()) == ('result', False)
+    assert flight._calls == {}
@@ -0,0 +1,77 @@
+import glob
+import os
+
+import pytest
+
+from config import Config
+from services.listing_parser import ListingExtractor, extract_with_scanner, extract_with_soup
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', '*.html')))
+
+PAGES = {
+    'plain': '<h1>Vintage camera</h1><div id="desc_div">Works fine.</div>',
+    'nested title': '<h1 class="x-item-title"><span>Used</span> <b>Nikon</b>  F3 </h1>',
+    'nested description': ('<h1>T</h1><div id="desc_div"><div><p>First</p><div>Second <i>line</i></div></div>'
+                           '<p>Third</p></div><div>outside</div>'),
+    'description first': '<div id="desc_div">Details</div><p>x</p><h1>Title after</h1>',
+    'vitabs only': '<h1>T</h1><div id="viTabs_0_is"><p>Tab text</p></div>',
+    'desc_div preferred': '<h1>T</h1><div id="viTabs_0_is">Tab text</div><div id="desc_div">Desc text</div>',
+    'desc_div inside vitabs': '<h1>T</h1><div id="viTabs_0_is">Tab <div id="desc_div">Desc</div> end</div>',
+    'first h1 wins': '<h1>First</h1><h1>Second</h1>',
+    'title inside description': '<div id="desc_div">Before <h1>Inner</h1> after</div>',
+    'script and style skipped': ('<h1>T<script>var a = "</h1>";</script></h1>'
+                                 '<div id="desc_div"><style>p {}</style>Text<script>x()</script> more</div>'),
+    'template skipped': '<h1>T</h1><div id="desc_div"><template><p>hidden</p></template>shown</div>',
+    'comments': '<h1>Ti<!-- note -->tle</h1><div id="desc_div">A<!-- x --> B</div>',
+    'entities': '<h1>Caf&eacute; &amp; bar &#8482;</h1><div id="desc_div">5 &lt; 6 &nbsp;ok</div>',
+    'self-closing tags': '<h1>Line<br/>break</h1><div id="desc_div">a<br>b<img src="x"/>c</div>',
+    'whitespace only nodes': '<h1>\n  <span> Title </span>\n</h1><div id="desc_div">\n\t<p> x </p>\n</div>',
+    'uppercase markup': '<H1>Upper</H1><DIV ID="desc_div">Caps</DIV>',
+    'unclosed description': '<h1>T</h1><div id="desc_div">never closed <p>para',
+    'unclosed title': '<h1>Title <span>part',
+    'no title or description': '<html><body><p>Nothing here</p></body></html>',
+    'empty description': '<h1>T</h1><div id="desc_div"></div>',
+    'other divs with ids': '<div id="desc_divider">no</div><div class="desc_div">no</div><h1>T</h1>',
+    'non-ascii': '<h1>Ñandú — 日本語</h1><div id="desc_div">Größe: M ✓</div>',
+}
+
+
+@pytest.mark.parametrize('name', sorted(PAGES))
+def test_scanner_matches_soup(name):
+    html = PAGES[name]
+    assert extract_with_scanner(html) == extract_with_soup(html)
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_scanner_matches_soup_on_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    assert extract_with_scanner(html) == extract_with_soup(html)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64])
+@pytest.mark.parametrize('name', ['nested description', 'entities', 'script and style skipped', 'non-ascii'])
+def test_chunked_feed_matches_whole_page(name, chunk_size, monkeypatch):
+    monkeypatch.setattr(Config, 'LISTING_PARSER', 'fast')
+    html = PAGES[name]
+    extractor = ListingExtractor()
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start:start + chunk_size])
+    assert extractor.result() == extract_with_soup(html)
+
+
+def test_scan_stops_once_title_and_description_are_found(monkeypatch):
+    monkeypatch.setattr(Config, 'LISTING_PARSER', 'fast')
+    extractor = ListingExtractor()
+
+    assert extractor.feed('<h1>T</h1><div id="desc_div">Desc</div>')
+    assert extractor.result() == ('T', 'Desc')
+
+
+def test_scan_continues_while_only_vitabs_is_found(monkeypatch):
+    monkeypatch.setattr(Config, 'LISTING_PARSER', 'fast')
+    extractor = ListingExtractor()
+
+    assert not extractor.feed('<h1>T</h1><div id="viTabs_0_is">Tab</div>')
+    assert extractor.feed('<div id="desc_div">Desc</div>')
+    assert extractor.result() == ('T', 'Desc')
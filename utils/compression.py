@@ -0,0 +1,78 @@
+"""
+Response compression and ETag validation for JSON routes.
+
+Bodies above COMPRESSION_MIN_SIZE are compressed with brotli (when the
+optional brotli package is installed) or gzip, whichever the client
+prefers. Each representation gets a strong ETag derived from the body
+plus the content coding, and a matching If-None-Match turns the response
+into a 304 before any compression work is done.
+"""
+import gzip
+import hashlib
+
+from werkzeug.http import remove_entity_headers
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli support is optional
+    brotli = None
+
+
+def negotiate_encoding(accept_encodings, size):
+    """Pick 'br', 'gzip' or None for a body of the given size"""
+    if size < Config.COMPRESSION_MIN_SIZE:
+        return None
+
+    candidates = []
+    if brotli is not None and accept_encodings['br']:
+        candidates.append((accept_encodings['br'], 1, 'br'))
+    if accept_encodings['gzip']:
+        candidates.append((accept_encodings['gzip'], 0, 'gzip'))
+    if not candidates:
+        return None
+    # Highest client quality wins; brotli breaks ties
+    return max(candidates)[2]
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+
+
+def body_etag(body, encoding):
+    """Strong ETag for one representation of a body"""
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'{digest}-{encoding}' if encoding else digest
+
+
+def finalize_response(request, response):
+    """Add an ETag, answer If-None-Match with 304 and compress the body when worthwhile"""
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+
+    body = response.get_data()
+    response.vary.add('Accept-Encoding')
+
+    # Pass-through bodies may already carry eBay's gzip encoding
+    encoding = response.headers.get('Content-Encoding')
+    already_encoded = encoding is not None
+    if not already_encoded:
+        encoding = negotiate_encoding(request.accept_encodings, len(body))
+
+    etag = body_etag(body, encoding)
+    response.set_etag(etag)
+
+    if request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        response.set_data(b'')
+        # A 304 describes the cached representation; only its validators and caching headers are sent
+        remove_entity_headers(response.headers)
+        return response
+
+    if encoding and not already_encoded:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,70 @@
+from flask import jsonify
+
+
+class EbayApiError(Exception):
+    """Raised when a call to the eBay API fails"""
+
+    def __init__(self, message, status_code=500, details=None, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.details = details
+        self.retry_after = retry_after
+
+
+class ValidationError(Exception):
+    """Raised when a client request is missing or has invalid parameters"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+# The *_error_body functions return (body, status code, headers) for both the Flask and the ASGI app
+
+def ebay_api_error_body(error):
+    """Error body for a failed eBay API call"""
+    response = {'error': error.message}
+    if error.details:
+        response['details'] = error.details
+    headers = {'Retry-After': str(error.retry_after)} if error.retry_after else {}
+    return response, error.status_code, headers
+
+
+def validation_error_body(error):
+    """Error body for an invalid client request"""
+    return {'error': error.message}, 400, {}
+
+
+def not_found_body():
+    """Error body for unknown routes"""
+    return {'error': 'Not found'}, 404, {}
+
+
+def server_error_body(error):
+    """Error body for unexpected failures"""
+    return {'error': 'Internal server error', 'details': str(error)}, 500, {}
+
+
+def handle_ebay_api_error(error):
+    """Return the JSON error body for a failed eBay API call"""
+    response, status_code, headers = ebay_api_error_body(error)
+    return jsonify(response), status_code, headers
+
+
+def handle_validation_error(error):
+    """Return the JSON error body for an invalid client request"""
+    response, status_code, headers = validation_error_body(error)
+    return jsonify(response), status_code, headers
+
+
+def handle_not_found(error):
+    """Return the JSON error body for unknown routes"""
+    response, status_code, headers = not_found_body()
+    return jsonify(response), status_code, headers
+
+
+def handle_server_error(error):
+    """Return the JSON error body for unexpected failures"""
+    response, status_code, headers = server_error_body(error)
+    return jsonify(response), status_code, headers
@@ -0,0 +1,161 @@
+"""
+Non-blocking log pipeline and access log.
+
+Handlers only put records on a queue; a listener thread formats them (JSON
+lines by default) and writes them out. Access records carry the route,
+query, status, latency, cache status and time spent calling eBay, and can
+be sampled per route.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import Config
+
+access_logger = logging.getLogger('ebay_proxy.access')
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the fields passed through `extra=` at the top level"""
+
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener's handler.
+    The stock prepare() formats the traceback into the message; this one
+    keeps it in exc_text, so JsonFormatter can write it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # exc_info holds a traceback object, which is rendered now while it is still valid
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a file written by several worker processes.
+    When another process has already rotated the file, this one switches to
+    the new file instead of rotating it again.
+    """
+
+    def shouldRollover(self, record):
+        if self.stream is not None:
+            try:
+                current = os.stat(self.baseFilename)
+                rotated = (current.st_dev, current.st_ino) != self._opened
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                self.stream.close()
+                self.stream = self._open()
+        return super().shouldRollover(record)
+
+    def _open(self):
+        stream = super()._open()
+        stat = os.fstat(stream.fileno())
+        self._opened = (stat.st_dev, stat.st_ino)
+        return stream
+
+
+def _build_handler():
+    if Config.LOG_FILE:
+        handler = SharedRotatingFileHandler(Config.LOG_FILE, maxBytes=Config.LOG_MAX_BYTES,
+                                            backupCount=Config.LOG_BACKUP_COUNT)
+    else:
+        handler = logging.StreamHandler()
+    if Config.LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    return handler
+
+
+def configure_logging():
+    """
+    Route all logging through a queue so request threads never wait for disk.
+    A QueueListener thread formats records and writes them to LOG_FILE
+    (rotated at LOG_MAX_BYTES) or to stderr when LOG_FILE is empty.
+    The listener is restarted in forked workers, as its thread stays behind
+    in the parent.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.setLevel(Config.LOG_LEVEL)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, _build_handler(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(lambda: _listener.stop())
+
+    def restart_in_child():
+        # Records queued but not yet written belong to the parent
+        queue_handler.queue = _listener.queue = queue.SimpleQueue()
+        _listener._thread = None
+        _listener.start()
+
+    os.register_at_fork(after_in_child=restart_in_child)
+
+
+def should_log_access(route, status, duration):
+    """Errors and slow requests are always logged; the rest by the route's LOG_ACCESS_SAMPLE_RATES share"""
+    if status >= 400 or duration >= Config.LOG_SLOW_REQUEST:
+        return True
+    rate = Config.LOG_ACCESS_SAMPLE_RATES.get(route, Config.LOG_ACCESS_SAMPLE_RATE)
+    return rate >= 1 or random.random() < rate
+
+
+def log_access(method, route, query, status, duration, cache, upstream):
+    """Write one access record; `upstream` is the request's upstream call stats or None"""
+    if not should_log_access(route, status, duration):
+        return
+    access_logger.info('%s %s %d %.1f ms', method, route, status, duration * 1000, extra={
+        'method': method,
+        'route': route,
+        'query': query[:Config.LOG_MAX_QUERY_LENGTH],
+        'status': status,
+        'duration_ms': round(duration * 1000, 1),
+        'cache': cache,
+        'upstream_calls': upstream['calls'] if upstream else 0,
+        'upstream_ms': round(upstream['seconds'] * 1000, 1) if upstream else 0.0
+    })
@@ -0,0 +1,226 @@
+"""
+Minimal Prometheus-style metrics.
+
+Counters and histograms are kept in process memory and rendered in the
+Prometheus text format by /metrics. Under gunicorn each worker keeps its
+own numbers; scrape every worker or run a single worker per container to
+get complete totals.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, count, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ('le', repr(bound)))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", "+Inf"))} {count}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """Register a callable returning exposition lines, evaluated at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self, collectors=()):
+        """Render every metric and collector; `collectors` adds ones owned by the caller, such as one app's"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in (*self._collectors, *collectors):
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'ebay_proxy_requests_total', 'HTTP requests handled by the proxy', ('route', 'method', 'status'))
+REQUEST_LATENCY = registry.histogram(
+    'ebay_proxy_request_duration_seconds', 'Time to handle a request, per route', ('route',))
+UPSTREAM_REQUESTS = registry.counter(
+    'ebay_proxy_upstream_requests_total', 'Calls made to eBay, per endpoint, marketplace and HTTP status',
+    ('endpoint', 'marketplace', 'status'))
+UPSTREAM_COALESCED = registry.counter(
+    'ebay_proxy_upstream_coalesced_total', 'Calls that joined an identical in-flight eBay call, per endpoint',
+    ('endpoint',))
+UPSTREAM_LATENCY = registry.histogram(
+    'ebay_proxy_upstream_duration_seconds', 'Latency of calls made to eBay, per endpoint and marketplace',
+    ('endpoint', 'marketplace'))
+STAGE_LATENCY = registry.histogram(
+    'ebay_proxy_stage_duration_seconds', 'Time spent per processing stage (oauth, serialize, parse)', ('stage',))
+TOKEN_REFRESHES = registry.counter(
+    'ebay_proxy_token_refreshes_total', 'OAuth token fetches, per outcome', ('outcome',))
+RATE_LIMITED = registry.counter(
+    'ebay_proxy_rate_limited_total', 'Requests rejected by the rate limiter, per route', ('route',))
+CATEGORY_INDEX_LOOKUPS = registry.counter(
+    'ebay_proxy_category_index_lookups_total', 'Local category index lookups, per result (local, fallback, not_loaded)',
+    ('result',))
+CACHE_WARM_CALLS = registry.counter(
+    'ebay_proxy_cache_warm_calls_total', 'eBay calls made by the cache warmer, per endpoint and result (ok, error)',
+    ('endpoint', 'result'))
+CIRCUIT_OPENED = registry.counter(
+    'ebay_proxy_circuit_opened_total', 'Times a circuit breaker opened, per upstream endpoint', ('endpoint',))
+
+
+# Upstream calls made for the current request, {'calls': n, 'seconds': total}; set per request for the access log
+request_upstream = contextvars.ContextVar('request_upstream', default=None)
+
+
+@contextmanager
+def observe_upstream(endpoint, marketplace=''):
+    """Time an upstream call; the body may set `call['status']` to record the HTTP status"""
+    call = {'status': 'error'}
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - start
+        stats = request_upstream.get()
+        if stats is not None:
+            stats['calls'] += 1
+            stats['seconds'] += elapsed
+        UPSTREAM_LATENCY.observe(elapsed, endpoint=endpoint, marketplace=marketplace)
+        UPSTREAM_REQUESTS.inc(endpoint=endpoint, marketplace=marketplace, status=call['status'])
+
+
+def cache_collector(caches):
+    """Collector exposing hit/miss counters of ResponseCache instances, given as {name: cache}"""
+    def collect():
+        stats = [(name, cache.stats()) for name, cache in caches.items() if cache is not None]
+        lines = [
+            '# HELP ebay_proxy_cache_requests_total Cache lookups per cache, endpoint and result',
+            '# TYPE ebay_proxy_cache_requests_total counter'
+        ]
+        for name, endpoints in stats:
+            for endpoint, counts in endpoints.items():
+                for result, field in (('hit', 'hits'), ('miss', 'misses'), ('stale', 'stale')):
+                    labels = _format_labels(('cache', 'endpoint', 'result'), (name, endpoint, result))
+                    lines.append(f'ebay_proxy_cache_requests_total{labels} {counts[field]}')
+        lines += [
+            '# HELP ebay_proxy_cache_hit_ratio Share of cache lookups that were hits',
+            '# TYPE ebay_proxy_cache_hit_ratio gauge'
+        ]
+        for name, endpoints in stats:
+            for endpoint, counts in endpoints.items():
+                lookups = counts['hits'] + counts['misses']
+                ratio = counts['hits'] / lookups if lookups else 0.0
+                labels = _format_labels(('cache', 'endpoint'), (name, endpoint))
+                lines.append(f'ebay_proxy_cache_hit_ratio{labels} {ratio}')
+        return lines
+    return collect
+
+
+def breaker_collector(breakers):
+    """Collector exposing circuit breaker states, given as {name: breaker}"""
+    states = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def collect():
+        lines = [
+            '# HELP ebay_proxy_circuit_state Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)',
+            '# TYPE ebay_proxy_circuit_state gauge'
+        ]
+        for name, breaker in sorted(breakers.items()):
+            lines.append(f'ebay_proxy_circuit_state{_format_labels(("endpoint",), (name,))} {states[breaker.state]}')
+        return lines
+    return collect
+
+
+def startup_collector(timings):
+    """Collector exposing how long app creation took, given as {phase: seconds}"""
+    def collect():
+        lines = [
+            '# HELP ebay_proxy_startup_seconds Time spent creating the app in this worker, per phase',
+            '# TYPE ebay_proxy_startup_seconds gauge'
+        ]
+        for phase, seconds in timings.items():
+            lines.append(f'ebay_proxy_startup_seconds{_format_labels(("phase",), (phase,))} {seconds}')
+        return lines
+    return collect
@@ -0,0 +1,68 @@
+"""
+Server-side field projection for eBay payloads.
+
+`fields` is a comma-separated list of dotted paths such as
+`itemId,title,price.value,image.imageUrl`, or the name of a built-in
+profile (`compact`). Paths through lists apply to every element.
+"""
+from functools import lru_cache
+
+PROFILES = {
+    'compact': 'itemId,title,price.value,price.currency,image.imageUrl,itemWebUrl'
+}
+
+# Search paging fields that are kept next to the projected itemSummaries
+SEARCH_ENVELOPE_FIELDS = ('total', 'offset', 'limit', 'next')
+
+MAX_FIELDS = 50
+
+
+@lru_cache(maxsize=256)
+def parse_fields(fields):
+    """
+    Compile a fields expression into a nested dict of path segments.
+    Returns None when no projection was requested; raises ValueError for
+    expressions that are too large or malformed.
+    """
+    fields = PROFILES.get(fields.strip().lower(), fields) if fields else ''
+    paths = [path.strip() for path in fields.split(',') if path.strip()]
+    if not paths:
+        return None
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f'At most {MAX_FIELDS} fields can be requested')
+
+    tree = {}
+    for path in paths:
+        segments = path.split('.')
+        if not all(segments):
+            raise ValueError(f'Invalid field path: {path}')
+        node = tree
+        for segment in segments[:-1]:
+            child = node.setdefault(segment, {})
+            if child is True:
+                break  # a parent path already selects the whole subtree
+            node = child
+        else:
+            node[segments[-1]] = True
+    return tree
+
+
+def project(value, tree):
+    """Return only the parts of value selected by a tree from parse_fields"""
+    if isinstance(value, list):
+        return [project(element, tree) for element in value]
+    if not isinstance(value, dict):
+        return value
+
+    result = {}
+    for key, subtree in tree.items():
+        if key in value:
+            result[key] = value[key] if subtree is True else project(value[key], subtree)
+    return result
+
+
+def project_search(results, tree):
+    """Project each item summary of a search response, keeping the paging fields"""
+    projected = {key: results[key] for key in SEARCH_ENVELOPE_FIELDS if key in results}
+    projected['itemSummaries'] = project(results.get('itemSummaries', []), tree)
+    return projected
@@ -0,0 +1,54 @@
+"""
+Request parameter parsing shared by the Flask (app.py) and ASGI (asgi.py) apps.
+
+Each function takes the query parameters as a mapping (Flask's
+request.args or Starlette's request.query_params) or the decoded JSON
+body, and raises ValidationError for values the API rejects.
+"""
+from config import Config
+from services.listing_parser import LISTING_URL_RE
+from utils.error_handlers import ValidationError
+from utils.projection import parse_fields
+
+
+def get_fields_projection(args):
+    """Parse the `fields` query parameter; returns None when no projection is requested"""
+    try:
+        return parse_fields(args.get('fields', ''))
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
+def get_marketplace(args, data=None):
+    """Read the `marketplace` parameter (query string, or JSON body for POST routes); defaults to EBAY_MARKETPLACE_ID"""
+    marketplace = args.get('marketplace') or (data or {}).get('marketplace')
+    if not marketplace:
+        return Config.EBAY_MARKETPLACE_ID
+    marketplace = str(marketplace).strip().upper()
+    if marketplace not in Config.EBAY_CATEGORY_TREE_IDS:
+        raise ValidationError(f"Unsupported marketplace: {marketplace}")
+    return marketplace
+
+
+def get_limit(args, default, maximum):
+    """Read the `limit` query parameter, capped at maximum; rejects values that are not integers of at least 1"""
+    limit = args.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError('Limit must be an integer')
+    if limit < 1:
+        raise ValidationError('Limit must be at least 1')
+    return min(limit, maximum)
+
+
+def get_listing_url(data):
+    """Read the eBay listing URL from an /analyze-listing body; data is None when the body is not valid JSON"""
+    url = data.get('url') if isinstance(data, dict) else None
+    if not url:
+        raise ValidationError("Missing URL")
+    if not isinstance(url, str) or not LISTING_URL_RE.match(url):
+        raise ValidationError("Invalid eBay listing URL")
+    return url
@@ -0,0 +1,77 @@
+"""
+State shared between worker processes.
+
+locked_file() opens a file that several workers read and rewrite (the
+OAuth token, the category tree, the popular cache keys) under an exclusive
+lock, creating it readable by this user only. WorkerThread starts a daemon
+thread once in each process: threads do not survive a fork, so every
+worker needs its own.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; shared files are then unlocked
+    fcntl = None
+
+
+def _open_private(path):
+    """
+    Open path for reading and writing, creating it 0600. A file left with
+    broader permissions is tightened, and a symlink in its place is refused.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    if hasattr(os, 'fchmod'):
+        os.fchmod(fd, 0o600)
+    return os.fdopen(fd, 'r+')
+
+
+@contextmanager
+def locked_file(path):
+    """Yield path opened for reading and writing, holding an exclusive lock until the block ends"""
+    with _open_private(path) as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_json(f):
+    """Parse the whole locked file; raises ValueError when it is empty or partial"""
+    f.seek(0)
+    return json.loads(f.read())
+
+
+def write_json(f, data):
+    """Replace the contents of the locked file with data"""
+    f.seek(0)
+    f.truncate()
+    json.dump(data, f)
+    f.flush()
+
+
+class WorkerThread:
+    """A daemon thread running target, started at most once per process"""
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self.thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self.thread.start()